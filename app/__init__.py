@@ -1,12 +1,19 @@
 # Make create_app function available at the package level
 # This allows "from app import create_app" to work
-from app.routes import register_routes
-from app.database import init_db
-from flask import Flask
-from flask_jwt_extended import JWTManager
+#
+# Flask, JWT and the routes are imported inside create_app() so that importing
+# app.database or app.query_processor on its own (benchmarks, tools, worker
+# processes) stays cheap.
 import os
 
 def create_app():
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+    from app.routes import register_routes, get_query_processor
+    from app.database import get_db_connection
+    from app.compression import init_compression
+    from app.warmup import start_warmup
+    
     # Create Flask app with explicit template folder path
     app = Flask(__name__, 
                 template_folder=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'templates')),
@@ -19,10 +26,18 @@ def create_app():
     # Initialize JWT
     jwt = JWTManager(app)
     
-    # Initialize database
-    init_db()
+    # Initialize the database once per process; with gunicorn's preload_app this
+    # happens in the master and workers inherit it copy-on-write
+    get_db_connection()
+    
+    # Build the shared query processor up front for the same reason, and warm
+    # it with popular queries within the configured time budget
+    start_warmup(get_query_processor())
     
     # Register routes
     register_routes(app)
     
+    # Compress responses for clients that accept it
+    init_compression(app)
+    
     return app
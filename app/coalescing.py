@@ -0,0 +1,74 @@
+import threading
+
+class CoalescingTimeout(Exception):
+    """Raised to a caller that gave up waiting on someone else's in-flight execution"""
+
+class _InFlight:
+    """A single execution that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class QueryCoalescer:
+    """
+    Lets concurrent callers asking for the same key share one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for it and receive the same result, or the same exception.
+    """
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def run(self, key, function, timeout=None):
+        """Return function()'s result, sharing it with concurrent callers for the same key"""
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _InFlight()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = function()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self.errors += 1
+                raise
+            finally:
+                # Later callers start a fresh execution
+                with self._lock:
+                    del self._in_flight[key]
+                call.done.set()
+
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise CoalescingTimeout("Timed out waiting for an identical query that is already running")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        """Return execution and coalescing counters"""
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "in_flight": len(self._in_flight)
+            }
@@ -0,0 +1,39 @@
+import gzip
+import os
+import zlib
+from flask import request
+
+# Response types worth compressing
+COMPRESSIBLE_MIMETYPES = ['application/json', 'text/html', 'text/css', 'text/plain', 'application/javascript']
+
+def init_compression(app):
+    """Compress responses with gzip or deflate when the client accepts it"""
+    app.config.setdefault('COMPRESS_LEVEL', int(os.environ.get('COMPRESS_LEVEL', 6)))
+    app.config.setdefault('COMPRESS_MIN_SIZE', int(os.environ.get('COMPRESS_MIN_SIZE', 500)))
+
+    @app.after_request
+    def compress_response(response):
+        # Leave streams, empty bodies and already-encoded responses alone
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        encoding = request.accept_encodings.best_match(['gzip', 'deflate'])
+        if encoding == 'gzip':
+            data = gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL'], mtime=0)
+        elif encoding == 'deflate':
+            data = zlib.compress(data, app.config['COMPRESS_LEVEL'])
+        else:
+            return response
+
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -1,9 +1,110 @@
 import sqlite3
 from sqlite3 import Error
+import hashlib
 import os
+import queue
+import re
+import threading
+import uuid
+from contextlib import contextmanager
 
-# Global connection object
+# Global connection object, and the URI of the in-memory database it holds
 conn = None
+db_uri = None
+
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 512
+
+# Tables created by create_tables()
+TABLES = ['customers', 'products', 'sales']
+
+# Column types and whether a value is required, used to validate ingested rows
+SCHEMA = {
+    'customers': [('id', int, False), ('name', str, True), ('email', str, True), ('signup_date', str, True)],
+    'products': [('id', int, False), ('name', str, True), ('category', str, True),
+                 ('price', float, True), ('inventory', int, True)],
+    'sales': [('id', int, False), ('customer_id', int, False), ('product_id', int, False),
+              ('quantity', int, True), ('sale_date', str, True), ('total_price', float, True)]
+}
+
+class ReadWriteLock:
+    """
+    Lets any number of readers in at once, or a single writer.
+
+    The writer may re-enter and read while it holds the lock, and waiting
+    writers go before new readers so a steady stream of reads can't starve them.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def reading(self):
+        me = threading.get_ident()
+        with self._condition:
+            nested = self._writer == me
+            if not nested:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            if not nested:
+                with self._condition:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer != me:
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._condition.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self._writer = me
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._condition.notify_all()
+
+# Reads of the shared connection take this shared and writes take it exclusively,
+# so no reader ever sees a writer's uncommitted rows and one writer's commit never
+# publishes another writer's half-finished transaction
+db_lock = ReadWriteLock()
+
+# Idle read connections for queries that run in parallel, each opened on the
+# shared in-memory database and tagged with its URI
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+_pool = queue.LifoQueue()
+_pool_pid = None
+
+# Per-table write counters, used to key ETags and cached results.
+# The origin is a fingerprint of the seeded data while nothing has been
+# written, so processes holding identical data agree on versions; the
+# first local write gives this process its own origin.
+data_versions = {}
+data_origin = 'seed'
+_version_lock = threading.Lock()
+
+# Callbacks run with the list of changed tables after every write
+_change_listeners = []
+
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+([A-Za-z_][A-Za-z0-9_]*)', re.IGNORECASE)
 
 def get_db_connection():
     """Return the database connection object"""
@@ -14,25 +115,38 @@ def get_db_connection():
 
 def init_db():
     """Initialize the in-memory SQLite database with mock data"""
-    global conn
+    global conn, db_uri, data_origin
     try:
-        # Create an in-memory database
-        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        # Create a named in-memory database in shared-cache mode, so pooled
+        # connections can open the same data instead of copying it; keep plenty
+        # of compiled statements around so warmed-up queries skip SQL compilation
+        db_uri = f"file:mini_data_query-{os.getpid()}-{uuid.uuid4().hex[:8]}?mode=memory&cache=shared"
+        conn = _connect(db_uri)
         conn.row_factory = sqlite3.Row
         
         # Create tables and insert mock data
         create_tables()
         insert_mock_data()
         
+        # Fresh mock data, so versions start over
+        fingerprint = hashlib.sha256('\n'.join(conn.iterdump()).encode('utf-8')).hexdigest()[:12]
+        with _version_lock:
+            data_versions.clear()
+            data_origin = f"seed-{fingerprint}"
+        
         print("Database initialized successfully")
         return conn
     except Error as e:
         print(f"Database initialization error: {e}")
         return None
 
-def create_tables():
-    """Create the necessary tables for our mock data"""
-    cursor = conn.cursor()
+def _connect(uri):
+    return sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+
+def create_tables(target=None):
+    """Create the necessary tables for our mock data (on target, or the global connection)"""
+    target = target or conn
+    cursor = target.cursor()
     
     # Create customers table
     cursor.execute('''
@@ -69,7 +183,7 @@ def create_tables():
     )
     ''')
     
-    conn.commit()
+    target.commit()
 
 def insert_mock_data():
     """Insert mock data into the tables"""
@@ -115,22 +229,146 @@ def insert_mock_data():
     
     conn.commit()
 
-def execute_query(query, params=()):
-    """Execute a query and return the results"""
+@contextmanager
+def pooled_connection():
+    """
+    Borrow a connection of its own for a read, so reads can run in parallel.
+
+    Pooled connections open the same shared-cache in-memory database as the
+    main connection, so they always see its committed data without copying it.
+    The read lock keeps them out while a writer's transaction is open.
+    """
+    global _pool, _pool_pid
+    if _pool_pid != os.getpid():
+        # Never reuse connections inherited across a fork
+        _pool = queue.LifoQueue()
+        _pool_pid = os.getpid()
+    
+    get_db_connection()
+    uri = db_uri
+    pooled = None
+    while pooled is None:
+        try:
+            pooled, pooled_uri = _pool.get_nowait()
+        except queue.Empty:
+            pooled, pooled_uri = _connect(uri), uri
+        if pooled_uri != uri:
+            # Left over from a database that init_db() has since replaced
+            pooled.close()
+            pooled = None
+    
+    try:
+        with db_lock.reading():
+            yield pooled
+    finally:
+        if _pool.qsize() < POOL_SIZE:
+            _pool.put((pooled, uri))
+        else:
+            pooled.close()
+
+def execute_query(query, params=(), pooled=False):
+    """Execute a query and return the results (reads use a pooled connection if pooled is set)"""
     try:
-        cursor = get_db_connection().cursor()
-        cursor.execute(query, params)
-        
         # Check if this is a SELECT query
         if query.strip().upper().startswith('SELECT'):
-            columns = [description[0] for description in cursor.description]
-            results = []
-            for row in cursor.fetchall():
-                results.append(dict(zip(columns, row)))
-            return results
+            if pooled:
+                with pooled_connection() as pooled_conn:
+                    return _fetch_dicts(pooled_conn.cursor(), query, params)
+            with db_lock.reading():
+                return _fetch_dicts(get_db_connection().cursor(), query, params)
         else:
-            get_db_connection().commit()
+            with db_lock.writing():
+                cursor = get_db_connection().cursor()
+                cursor.execute(query, params)
+                get_db_connection().commit()
+                bump_data_version(tables_in_sql(query) or TABLES)
             return {"affected_rows": cursor.rowcount}
     except Error as e:
         print(f"Query execution error: {e}")
         return None
+
+class ResultSet:
+    """Rows as plain tuples sharing a single column header"""
+    
+    __slots__ = ('columns', 'rows')
+    
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def to_dicts(self):
+        """Return the rows the way execute_query() does"""
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+def execute_query_fast(query, params=(), pooled=False):
+    """Execute a SELECT and return a ResultSet of plain tuples, skipping per-row Row and dict objects"""
+    try:
+        if pooled:
+            with pooled_connection() as pooled_conn:
+                return _fetch_result_set(pooled_conn.cursor(), query, params)
+        with db_lock.reading():
+            return _fetch_result_set(get_db_connection().cursor(), query, params)
+    except Error as e:
+        print(f"Query execution error: {e}")
+        return None
+
+def _fetch_result_set(cursor, query, params):
+    cursor.row_factory = None
+    cursor.execute(query, params)
+    return ResultSet([description[0] for description in cursor.description], cursor.fetchall())
+
+def _fetch_dicts(cursor, query, params):
+    """Run a SELECT on cursor and return the rows as dicts"""
+    cursor.execute(query, params)
+    columns = [description[0] for description in cursor.description]
+    results = []
+    for row in cursor.fetchall():
+        results.append(dict(zip(columns, row)))
+    return results
+
+def build_insert_sql(table, columns, upsert=False):
+    """Build a parameterized INSERT for the given columns, optionally as an upsert on id"""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    if upsert:
+        updates = [f"{column} = excluded.{column}" for column in columns if column != 'id']
+        sql += " ON CONFLICT(id) DO " + (f"UPDATE SET {', '.join(updates)}" if updates else "NOTHING")
+    return sql
+
+def tables_in_sql(sql):
+    """Return the lowercase names of the tables a SQL statement touches"""
+    return sorted({name.lower() for name in _TABLE_PATTERN.findall(sql or '')})
+
+def get_data_version(tables=None):
+    """Return a version string for the given tables (all tables if None)"""
+    with _version_lock:
+        if tables is None:
+            tables = sorted(data_versions)
+        parts = [f"{table}={data_versions.get(table, 0)}" for table in tables]
+        return f"{data_origin}:" + ",".join(parts)
+
+def get_data_origin():
+    """Return the identifier of the data this process is serving"""
+    return data_origin
+
+def bump_data_version(tables):
+    """Record a write to the given tables"""
+    global data_origin
+    with _version_lock:
+        if data_origin.startswith('seed'):
+            data_origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        for table in tables:
+            data_versions[table] = data_versions.get(table, 0) + 1
+    
+    for listener in list(_change_listeners):
+        try:
+            listener(list(tables))
+        except Exception as e:
+            print(f"Data change listener error: {e}")
+
+def add_change_listener(listener):
+    """Register a callback to run with the changed tables after each write"""
+    _change_listeners.append(listener)
@@ -0,0 +1,82 @@
+import base64
+import json
+import math
+from json.encoder import encode_basestring_ascii
+
+# Rows encoded per chunk; bounds the per-column scratch lists
+CHUNK_ROWS = 10000
+
+_int_repr = int.__repr__
+_float_repr = float.__repr__
+
+def _encode_value(value):
+    """Encode one SQLite value (NULL, INTEGER, REAL, TEXT or BLOB) as JSON text"""
+    value_type = type(value)
+    if value_type is str:
+        return encode_basestring_ascii(value)
+    if value_type is int:
+        return _int_repr(value)
+    if value_type is float:
+        # Same spellings as the json module for non-finite numbers
+        if value != value:
+            return 'NaN'
+        if value in (math.inf, -math.inf):
+            return 'Infinity' if value > 0 else '-Infinity'
+        return _float_repr(value)
+    if value is None:
+        return 'null'
+    if value_type is bytes:
+        return '"' + base64.b64encode(value).decode('ascii') + '"'
+    raise TypeError(f"Unsupported SQLite value of type {value_type.__name__}")
+
+def _encode_column(values):
+    """Encode a column of values, mapping one encoder over it when every value has the same type"""
+    types = set(map(type, values))
+    if len(types) == 1:
+        value_type = types.pop()
+        if value_type is int:
+            return list(map(_int_repr, values))
+        if value_type is str:
+            return list(map(encode_basestring_ascii, values))
+        if value_type is float and all(map(math.isfinite, values)):
+            return list(map(_float_repr, values))
+    return list(map(_encode_value, values))
+
+def encode_rows(result_set):
+    """
+    Encode a ResultSet as a JSON array of row objects.
+
+    Produces what json.dumps(result_set.to_dicts(), sort_keys=True) would, without
+    building the dicts: values are encoded a column at a time and stitched into rows
+    with one format string.
+    """
+    columns = result_set.columns
+    rows = result_set.rows
+    if not rows:
+        return b'[]'
+
+    # Sorted keys like jsonify; a repeated column name keeps its last value like dict(zip())
+    positions = {name: index for index, name in enumerate(columns)}
+    names = sorted(positions)
+    indexes = [positions[name] for name in names]
+    template = '{' + ','.join(encode_basestring_ascii(name).replace('%', '%%') + ':%s' for name in names) + '}'
+
+    chunks = []
+    for start in range(0, len(rows), CHUNK_ROWS):
+        chunk = rows[start:start + CHUNK_ROWS]
+        encoded = [_encode_column([row[index] for row in chunk]) for index in indexes]
+        chunks.append(','.join([template % values for values in zip(*encoded)]))
+    return ('[' + ','.join(chunks) + ']').encode('ascii')
+
+def encode_results(result_set):
+    """Encode a successful query result the way QueryProcessor.execute_query() shapes it"""
+    return b'{"data":' + encode_rows(result_set) + b',"success":true}'
+
+def encode_query_response(query_text, query_data, results):
+    """Assemble the /query response body around already-encoded results"""
+    return b''.join([
+        b'{"parsed_query":', json.dumps(query_data, sort_keys=True, separators=(',', ':')).encode('ascii'),
+        b',"query":', encode_basestring_ascii(query_text).encode('ascii'),
+        b',"results":', results,
+        b'}\n'
+    ])
@@ -0,0 +1,228 @@
+import csv
+import io
+import json
+import time
+from sqlite3 import Error
+from flask import jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from .auth import USERS
+from .database import SCHEMA, build_insert_sql, bump_data_version, db_lock, get_db_connection
+
+# Rows per executemany call
+DEFAULT_BATCH_SIZE = 1000
+# Rows per committed transaction
+DEFAULT_TRANSACTION_ROWS = 50000
+# Cap on the number of errors echoed back to the client
+MAX_REPORTED_ERRORS = 100
+
+class RowError(ValueError):
+    """Raised when an ingested row does not match the table schema"""
+
+def parse_ndjson(stream):
+    """Yield (line_number, record) pairs from a newline-delimited JSON stream"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, RowError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_number, RowError("Each line must be a JSON object")
+            continue
+        yield line_number, record
+
+def parse_csv(stream):
+    """Yield (line_number, record) pairs from a CSV stream with a header row"""
+    reader = csv.DictReader(stream)
+    for record in reader:
+        if None in record:
+            yield reader.line_num, RowError("Row has more fields than the header")
+            continue
+        # Empty CSV fields mean "no value"
+        yield reader.line_num, {key: (value if value != '' else None) for key, value in record.items()}
+
+def _coerce(value, column_type):
+    """Convert a JSON or CSV value to the column's Python type"""
+    if column_type is str:
+        if not isinstance(value, str):
+            raise ValueError("expected a string")
+        return value
+    if isinstance(value, bool):
+        raise ValueError("expected a number")
+    if column_type is int:
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError("expected an integer")
+        return int(value)
+    return float(value)
+
+def validate_row(table, record):
+    """Return the record as a tuple in schema column order, or raise RowError"""
+    columns = SCHEMA[table]
+    unknown = set(record) - {name for name, _, _ in columns}
+    if unknown:
+        raise RowError(f"Unknown columns: {', '.join(sorted(unknown))}")
+
+    values = []
+    for name, column_type, required in columns:
+        value = record.get(name)
+        if value is None:
+            if required:
+                raise RowError(f"Missing required column '{name}'")
+            values.append(None)
+            continue
+        try:
+            values.append(_coerce(value, column_type))
+        except (TypeError, ValueError) as e:
+            raise RowError(f"Invalid value for '{name}': {e}")
+    return tuple(values)
+
+def ingest_rows(table, records, upsert=False, batch_size=DEFAULT_BATCH_SIZE,
+                transaction_rows=DEFAULT_TRANSACTION_ROWS):
+    """Validate and insert (line_number, record) pairs in batches, returning ingest statistics"""
+    columns = [name for name, _, _ in SCHEMA[table]]
+    sql = build_insert_sql(table, columns, upsert)
+    conn = get_db_connection()
+
+    stats = {
+        "table": table,
+        "mode": "upsert" if upsert else "insert",
+        "rows_received": 0,
+        "rows_written": 0,
+        "rows_rejected": 0,
+        "batches": 0,
+        "failed_batches": 0,
+        "errors": []
+    }
+    started = time.perf_counter()
+    batch = []
+    batch_errors = []
+    # Validated batches waiting for the next commit, as (batch_number, rows)
+    pending = []
+    pending_rows = 0
+
+    def report(error):
+        if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+            stats["errors"].append(error)
+
+    def flush_batch():
+        nonlocal batch, batch_errors, pending_rows
+        stats["batches"] += 1
+        batch_number = stats["batches"]
+        for error in batch_errors:
+            error["batch"] = batch_number
+            report(error)
+        if batch:
+            pending.append((batch_number, batch))
+            pending_rows += len(batch)
+        batch = []
+        batch_errors = []
+        if pending_rows >= transaction_rows:
+            commit()
+
+    def commit():
+        # The lock is only held while writing a buffered transaction, never
+        # while reading the upload, so a slow client can't stall other writers
+        nonlocal pending_rows
+        if not pending:
+            return
+        written = 0
+        with db_lock.writing():
+            cursor = conn.cursor()
+            # An explicit BEGIN makes the batch savepoints nest inside one
+            # transaction instead of each committing on release
+            cursor.execute("BEGIN")
+            try:
+                for batch_number, rows in pending:
+                    # A savepoint per batch lets one bad batch roll back without
+                    # losing the rest of the transaction
+                    cursor.execute("SAVEPOINT ingest_batch")
+                    try:
+                        cursor.executemany(sql, rows)
+                        cursor.execute("RELEASE SAVEPOINT ingest_batch")
+                        written += len(rows)
+                    except Error as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT ingest_batch")
+                        cursor.execute("RELEASE SAVEPOINT ingest_batch")
+                        stats["failed_batches"] += 1
+                        stats["rows_rejected"] += len(rows)
+                        report({"batch": batch_number, "rows": len(rows), "error": str(e)})
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                pending.clear()
+                pending_rows = 0
+                # Bump even if every batch rolled back, so nothing keyed to the
+                # old version outlives a window that touched the table
+                bump_data_version([table])
+        stats["rows_written"] += written
+
+    # If reading the upload fails, rows not yet committed are dropped; every
+    # committed transaction has already bumped the data version
+    for line_number, record in records:
+        stats["rows_received"] += 1
+        try:
+            if isinstance(record, RowError):
+                raise record
+            batch.append(validate_row(table, record))
+        except RowError as e:
+            stats["rows_rejected"] += 1
+            batch_errors.append({"line": line_number, "error": str(e)})
+        if len(batch) + len(batch_errors) >= batch_size:
+            flush_batch()
+    if batch or batch_errors:
+        flush_batch()
+    commit()
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_seconds"] = round(elapsed, 4)
+    stats["rows_per_second"] = round(stats["rows_written"] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+def register_ingest_routes(app, query_processor):
+    @app.route('/ingest/<table>', methods=['POST'])
+    @jwt_required()
+    def bulk_ingest(table):
+        if USERS.get(get_jwt_identity(), {}).get("role") != "admin":
+            return jsonify({"error": "Bulk ingest requires the admin role"}), 403
+
+        # Reads come from the shard files, which this endpoint doesn't write
+        if query_processor.shard_router is not None:
+            return jsonify({"error": "Bulk ingest is not available while SHARD_DIR is set; "
+                                     "load shards with ShardRouter.load() instead"}), 400
+
+        if table not in SCHEMA:
+            return jsonify({"error": f"Unknown table '{table}'. Valid tables are: {', '.join(SCHEMA)}"}), 400
+
+        mode = request.args.get('mode', 'insert')
+        if mode not in ('insert', 'upsert'):
+            return jsonify({"error": "mode must be 'insert' or 'upsert'"}), 400
+
+        try:
+            batch_size = int(request.args.get('batch_size', DEFAULT_BATCH_SIZE))
+            transaction_rows = int(request.args.get('transaction_rows', DEFAULT_TRANSACTION_ROWS))
+        except ValueError:
+            return jsonify({"error": "batch_size and transaction_rows must be integers"}), 400
+        if batch_size < 1 or transaction_rows < 1:
+            return jsonify({"error": "batch_size and transaction_rows must be positive"}), 400
+
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json-lines'):
+            parser = parse_ndjson
+        elif request.mimetype == 'text/csv':
+            parser = parse_csv
+        else:
+            return jsonify({"error": "Content-Type must be application/x-ndjson or text/csv"}), 415
+
+        # Decode the body incrementally instead of buffering the whole upload
+        stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+        try:
+            stats = ingest_rows(table, parser(stream), upsert=(mode == 'upsert'),
+                                batch_size=batch_size, transaction_rows=transaction_rows)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return jsonify({"error": f"Could not read request body: {e}"}), 400
+
+        return jsonify(stats), 200
@@ -1,14 +1,45 @@
 import re
 import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from .database import execute_query
+from .database import execute_query, execute_query_fast, get_data_version, get_data_origin, tables_in_sql, add_change_listener
+from .coalescing import QueryCoalescer, CoalescingTimeout
+from .fast_json import encode_results
+
+# Conjunctions that can join independent questions in one query
+_CONJUNCTION_PATTERN = re.compile(r'(\s*(?:[,;]\s*)?(?:\bas well as\b|\bplus\b|\band\b)\s*|\s*[,;]\s*)', re.IGNORECASE)
 
 class QueryProcessor:
     """
     Processes natural language queries and converts them to SQL-like statements
     """
     
-    def __init__(self):
+    def __init__(self, result_cache=None, coalesce_timeout=30.0, parse_cache_size=1024, shard_router=None,
+                 compound_workers=4):
+        # Optional router sending reads to sharded SQLite files instead of the local database
+        self.shard_router = shard_router
+        
+        # Optional cache of serialized results, keyed by SQL, params and data version
+        self.result_cache = result_cache
+        if result_cache is not None:
+            add_change_listener(self._invalidate_results)
+        
+        # Shares in-flight executions between concurrent identical queries
+        self.coalescer = QueryCoalescer(timeout=coalesce_timeout)
+        
+        # Runs the parts of compound queries side by side
+        self.compound_workers = compound_workers
+        self._compound_executor = None
+        self._compound_lock = threading.Lock()
+        
+        # Most recently used parses, keyed by the exact query text
+        self.parse_cache_size = parse_cache_size
+        self._parse_cache = OrderedDict()
+        self._parse_lock = threading.Lock()
+        
         # Keywords to identify query intent
         self.keywords = {
             'select': ['show', 'get', 'find', 'list', 'display', 'retrieve'],
@@ -19,6 +50,11 @@ class QueryProcessor:
             'min': ['minimum', 'lowest', 'cheapest', 'smallest']
         }
         
+        # Operation keywords as whole words, for telling independent questions apart
+        self._operation_pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(word) for words in self.keywords.values() for word in words) + r')\b',
+            re.IGNORECASE)
+        
         # Entity mapping
         self.entities = {
             'customers': ['customers', 'users', 'clients', 'buyers'],
@@ -26,6 +62,15 @@ class QueryProcessor:
             'sales': ['sales', 'purchases', 'transactions', 'orders']
         }
         
+        # Words that name what a question is about: a table (singular or plural),
+        # a product category, or the price terms that imply the products table
+        subject_words = [word for words in self.entities.values() for word in words]
+        subject_words += [word[:-1] for word in subject_words if word.endswith('s')]
+        subject_words += ['electronics', 'clothing', 'footwear', 'home appliances',
+                          'expensive', 'cheapest', 'price', 'cost']
+        self._subject_pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(word) for word in subject_words) + r')\b', re.IGNORECASE)
+        
         # Time period mapping
         self.time_periods = {
             'last month': self._get_last_month_range(),
@@ -126,8 +171,48 @@ class QueryProcessor:
         
         return conditions
     
+    def split_compound_query(self, query_text):
+        """
+        Split a query like "how many customers and total sales last month" on its
+        conjunctions. It is only split where the pieces on both sides are complete
+        questions: each asks for its own operation ("how many", "total", "show", ...)
+        and names its own subject (a table, category or price). Anything else,
+        like "products" in "sales from customers and products" or the shared subject
+        in "the maximum and minimum price of products", stays one question, so
+        simple queries come back whole.
+        """
+        pieces = _CONJUNCTION_PATTERN.split(query_text)
+        parts = [pieces[0]]
+        for separator, piece in zip(pieces[1::2], pieces[2::2]):
+            if self._is_complete_question(piece) and self._is_complete_question(parts[-1]):
+                parts.append(piece)
+            else:
+                parts[-1] += separator + piece
+        return [part.strip() for part in parts if part.strip()]
+    
+    def _is_complete_question(self, text):
+        return bool(self._operation_pattern.search(text) and self._subject_pattern.search(text))
+    
     def process_query(self, query_text):
         """Process a natural language query and convert it to a pseudo-SQL query"""
+        with self._parse_lock:
+            cached = self._parse_cache.get(query_text)
+            if cached is not None:
+                self._parse_cache.move_to_end(query_text)
+        if cached is None:
+            cached = self._parse_query(query_text)
+            with self._parse_lock:
+                self._parse_cache[query_text] = cached
+                if len(self._parse_cache) > self.parse_cache_size:
+                    self._parse_cache.popitem(last=False)
+        
+        # Hand out copies so callers can't alter the cached parse
+        query_data = dict(cached)
+        query_data["conditions"] = list(cached["conditions"])
+        return query_data
+    
+    def _parse_query(self, query_text):
+        """Convert a natural language query to a pseudo-SQL query"""
         entity = self._identify_entity(query_text)
         operation = self._identify_operation(query_text)
         conditions = self._identify_conditions(query_text, entity)
@@ -254,8 +339,8 @@ class QueryProcessor:
         
         return explanation
     
-    def validate_query(self, query_data):
-        """Check if a query is feasible with the current database schema"""
+    def validate_query(self, query_data, tenant=None):
+        """Check if a query is feasible with the current database schema (or the tenant's shards)"""
         entity = query_data.get("entity", "")
         operation = query_data.get("operation", "")
         conditions = query_data.get("conditions", [])
@@ -277,10 +362,10 @@ class QueryProcessor:
                 "error": f"Operation '{operation}' is not supported. Valid operations are: {', '.join(valid_operations)}"
             }
         
-        # Try executing the query to see if it works
+        # Try executing the query to see if it works, on the shards when reads are sharded
         try:
-            result = execute_query(sql)
-            if result is not None:
+            result = self._run_query(sql, tenant)
+            if result["success"]:
                 return {
                     "valid": True,
                     "message": "The query is valid and can be executed successfully."
@@ -296,12 +381,121 @@ class QueryProcessor:
                 "error": f"Error executing query: {str(e)}"
             }
     
-    def execute_query(self, query_data):
+    def _result_key(self, sql, params=(), tenant=None):
+        """Hash the SQL, its params and the data version of the tables it reads"""
+        if self.shard_router is not None:
+            try:
+                version = self.shard_router.data_version(tenant)
+            except (ValueError, OSError):
+                version = 'unavailable'
+        else:
+            version = get_data_version(tables_in_sql(sql))
+        key = json.dumps([sql, list(params), tenant, version])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+    
+    def _invalidate_results(self, tables):
+        """Drop cached results read from tables this process just wrote"""
+        self.result_cache.invalidate(get_data_origin(), tables)
+    
+    def result_etag(self, query_data, params=(), tenant=None):
+        """Return an ETag for the query's result at the current data version"""
+        return self._result_key(query_data.get("sql", ""), params, tenant)
+    
+    def compound_etag(self, parts, params=(), tenant=None):
+        """Return an ETag covering every part of a compound query"""
+        keys = [self._result_key(query_data.get("sql", ""), params, tenant) for query_data in parts]
+        return hashlib.sha256('|'.join(keys).encode('utf-8')).hexdigest()[:32]
+    
+    def execute_query(self, query_data, tenant=None, pooled=False):
         """Execute the SQL query and return the results"""
         sql = query_data.get("sql", "")
         
+        # Only reads are shared, cached and sharded
+        if not sql.strip().upper().startswith('SELECT'):
+            return self._run_query(sql)
+        
+        # Concurrent callers asking for the same SQL at the same data version
+        # wait on a single execution and share its result
+        key = self._result_key(sql, tenant=tenant)
+        try:
+            return self.coalescer.run(key, lambda: self._run_select(sql, key, tenant, pooled))
+        except CoalescingTimeout as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error executing query: {str(e)}"
+            }
+    
+    def execute_query_encoded(self, query_data, tenant=None):
+        """
+        Like execute_query(), but return (results encoded as JSON bytes, row count).
+        
+        Rows are fetched as plain tuples and encoded straight to bytes, and cached
+        results are passed through without being decoded. The row count is None
+        for failures.
+        """
+        sql = query_data.get("sql", "")
+        if not sql.strip().upper().startswith('SELECT') or self.shard_router is not None:
+            result = self.execute_query(query_data, tenant)
+            rows = len(result["data"]) if result["success"] and isinstance(result["data"], list) else None
+            return json.dumps(result, sort_keys=True, separators=(',', ':')).encode('utf-8'), rows
+        
+        # Shares the result cache with execute_query(), but bytes and dicts
+        # are coalesced separately
+        key = self._result_key(sql, tenant=tenant)
+        try:
+            return self.coalescer.run('encoded:' + key, lambda: self._run_select_encoded(sql, key))
+        except CoalescingTimeout as e:
+            return json.dumps({"error": str(e), "success": False}, separators=(',', ':')).encode('utf-8'), None
+        except Exception as e:
+            return json.dumps({"error": f"Error executing query: {str(e)}", "success": False}, separators=(',', ':')).encode('utf-8'), None
+    
+    def _run_select_encoded(self, sql, key):
+        """Serve encoded results from the result cache, executing and caching them on a miss"""
+        origin = get_data_origin()
+        if self.result_cache is not None:
+            cached = self.result_cache.get_entry(key)
+            if cached is not None:
+                return cached
+        
+        result_set = execute_query_fast(sql)
+        if result_set is None:
+            return json.dumps({"error": "Failed to execute query", "success": False}, separators=(',', ':')).encode('utf-8'), None
+        encoded = encode_results(result_set)
+        if self.result_cache is not None:
+            self.result_cache.put(key, encoded, origin, tables_in_sql(sql), len(result_set))
+        return encoded, len(result_set)
+    
+    def _run_select(self, sql, key, tenant=None, pooled=False):
+        """Serve a read from the result cache, executing and caching it on a miss"""
+        if self.result_cache is None:
+            return self._run_query(sql, tenant, pooled)
+        
+        # Local writes never touch shard files, so sharded entries aren't tied to this process
+        origin = get_data_origin() if self.shard_router is None else 'shards'
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        
+        response = self._run_query(sql, tenant, pooled)
+        if response["success"]:
+            # Same canonical bytes the encoded path stores, so /query can send either as is
+            rows = len(response["data"]) if isinstance(response["data"], list) else None
+            self.result_cache.put(key, json.dumps(response, sort_keys=True, separators=(',', ':')).encode('utf-8'),
+                                  origin, tables_in_sql(sql), rows)
+        return response
+    
+    def _run_query(self, sql, tenant=None, pooled=False):
+        """Run SQL against the database (or the shards, for reads) and wrap the outcome"""
         try:
-            result = execute_query(sql)
+            if self.shard_router is not None and sql.strip().upper().startswith('SELECT'):
+                result = self.shard_router.execute_query(sql, tenant=tenant)
+            else:
+                result = execute_query(sql, pooled=pooled)
             if result is not None:
                 return {
                     "success": True,
@@ -317,3 +511,23 @@ class QueryProcessor:
                 "success": False,
                 "error": f"Error executing query: {str(e)}"
             }
+    
+    def execute_compound(self, parts, tenant=None):
+        """Execute several parsed queries concurrently, each on its own pooled connection"""
+        if len(parts) == 1:
+            return [self.execute_query(parts[0], tenant=tenant)]
+        
+        with self._compound_lock:
+            if self._compound_executor is None:
+                self._compound_executor = ThreadPoolExecutor(max_workers=self.compound_workers,
+                                                             thread_name_prefix='compound')
+        futures = [self._compound_executor.submit(self.execute_query, query_data, tenant, True)
+                   for query_data in parts]
+        return [future.result() for future in futures]
+    
+    def stats(self):
+        """Return coalescing and result cache counters"""
+        stats = {"coalescing": self.coalescer.stats()}
+        if self.result_cache is not None:
+            stats["result_cache"] = self.result_cache.stats()
+        return stats
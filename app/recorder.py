@@ -0,0 +1,91 @@
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+class WorkloadRecorder:
+    """
+    Appends one compact JSON line per request to a workload log.
+
+    record() only enqueues; a background thread batches the lines and appends them
+    with a single write, so the request path never touches the file. Records are
+    dropped (and counted) rather than blocking if the queue fills up.
+    """
+
+    def __init__(self, path, flush_interval=1.0, max_pending=10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @classmethod
+    def from_env(cls):
+        """Build a recorder writing to QUERY_LOG_PATH, or None if it is not set"""
+        path = os.environ.get('QUERY_LOG_PATH')
+        if not path:
+            return None
+        return cls(path, float(os.environ.get('QUERY_LOG_FLUSH_INTERVAL', 1.0)))
+
+    def _ensure_writer(self):
+        """Start the writer thread in this process (again after a fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._write_loop, name='workload-recorder', daemon=True).start()
+            atexit.register(self.flush)
+
+    def record(self, endpoint, identity, query, sql, latency, rows=None, tenant=None):
+        """Queue one request for the log"""
+        self._ensure_writer()
+        entry = {
+            "ts": round(time.time(), 6),
+            "identity": hashlib.sha256(str(identity).encode('utf-8')).hexdigest()[:16],
+            "endpoint": endpoint,
+            "query": query,
+            "sql": sql,
+            "latency_ms": round(latency * 1000, 3),
+            "rows": rows,
+            "tenant": tenant
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Append everything queued so far to the log"""
+        lines = []
+        while True:
+            try:
+                lines.append(json.dumps(self._queue.get_nowait(), separators=(',', ':')))
+            except queue.Empty:
+                break
+        if not lines:
+            return
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        try:
+            # A single O_APPEND write per batch keeps lines from different
+            # workers from interleaving
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            self.recorded += len(lines)
+        except OSError as e:
+            self.dropped += len(lines)
+            print(f"Workload recorder write error: {e}")
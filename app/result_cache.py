@@ -0,0 +1,207 @@
+import glob
+import hashlib
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+
+# Default size of the cache file shared by all workers on a host
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Version of the entry encoding; bump it when the bytes stored for a key change shape
+FORMAT_VERSION = 2
+
+def _build_fingerprint():
+    """Hash the app's source so checkouts running different code never share entries"""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+BUILD_ID = _build_fingerprint()
+
+def default_cache_path():
+    """
+    Return the cache file in a directory only this user can access, or None if
+    that directory can't be trusted (owned by someone else or open to others).
+    """
+    uid = os.getuid() if hasattr(os, 'getuid') else None
+    directory = os.path.join(tempfile.gettempdir(), f"mini_data_query-{uid if uid is not None else 'cache'}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        print(f"Result cache disabled: {e}")
+        return None
+
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or (uid is not None and info.st_uid != uid) or info.st_mode & 0o077:
+        print(f"Result cache disabled: {directory} is not a private directory")
+        return None
+    return os.path.join(directory, 'results.sqlite')
+
+class SharedResultCache:
+    """
+    Query result cache backed by a SQLite file, shared by every worker process on one host.
+
+    Keys must already include the data version of the tables a result was read from,
+    so a stale entry can never be returned; entries are also dropped eagerly when this
+    process writes to a table, and the oldest entries are evicted past max_bytes.
+    Keys are namespaced by FORMAT_VERSION and BUILD_ID, so other builds sharing the
+    file never read each other's entries.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, timeout=0.25):
+        self.path = path
+        self.namespace = f"v{FORMAT_VERSION}-{BUILD_ID}:"
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from RESULT_CACHE_PATH / RESULT_CACHE_MAX_BYTES, or None if disabled"""
+        path = os.environ.get('RESULT_CACHE_PATH')
+        if path is None:
+            path = default_cache_path()
+            if path is None:
+                return None
+        if path.lower() in ('', 'off', 'none', '0'):
+            return None
+        return cls(path, int(os.environ.get('RESULT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)))
+
+    def _connection(self):
+        """Return this thread's connection, reopening it after a fork"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                origin TEXT NOT NULL,
+                tables TEXT NOT NULL,
+                created REAL NOT NULL,
+                rows INTEGER
+            )
+            ''')
+            # Files created before row counts were stored
+            if 'rows' not in [column[1] for column in conn.execute('PRAGMA table_info(entries)')]:
+                conn.execute('ALTER TABLE entries ADD COLUMN rows INTEGER')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_created ON entries (created)')
+            conn.execute('CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)')
+            conn.execute('INSERT OR IGNORE INTO usage VALUES (0, 0)')
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key):
+        """Return the cached bytes for key, or None on a miss"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key):
+        """Return (cached bytes, row count) for key, or None on a miss"""
+        try:
+            row = self._connection().execute('SELECT value, rows FROM entries WHERE key = ?',
+                                              (self.namespace + key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Result cache read error: {e}")
+            row = None
+        self._count('hits' if row is not None else 'misses')
+        return tuple(row) if row is not None else None
+
+    def put(self, key, value, origin, tables, rows=None):
+        """Publish an entry; readers see either the whole entry or nothing"""
+        key = self.namespace + key
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                old = conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+                conn.execute('INSERT OR REPLACE INTO entries (key, value, size, origin, tables, created, rows) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (key, value, len(value), origin, ','.join(tables), time.time(), rows))
+                conn.execute('UPDATE usage SET total_bytes = total_bytes + ? WHERE id = 0',
+                             (len(value) - (old[0] if old else 0),))
+                self._evict(conn)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            # A busy or broken cache only costs us the entry
+            print(f"Result cache write error: {e}")
+
+    def _evict(self, conn):
+        """Drop the oldest entries until the cache fits in max_bytes"""
+        total = conn.execute('SELECT total_bytes FROM usage WHERE id = 0').fetchone()[0]
+        while total > self.max_bytes:
+            rows = conn.execute('SELECT key, size FROM entries ORDER BY created LIMIT 64').fetchall()
+            if not rows:
+                break
+            freed = 0
+            evicted = 0
+            for key, size in rows:
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                freed += size
+                evicted += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            conn.execute('UPDATE usage SET total_bytes = total_bytes - ? WHERE id = 0', (freed,))
+            self._count('evictions', evicted)
+
+    def invalidate(self, origin, tables):
+        """Drop entries read from the given tables of the given data origin"""
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for table in tables:
+                    pattern = f"%,{table},%"
+                    freed = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE origin = ? AND ',' || tables || ',' LIKE ?",
+                                         (origin, pattern)).fetchone()[0]
+                    conn.execute("DELETE FROM entries WHERE origin = ? AND ',' || tables || ',' LIKE ?", (origin, pattern))
+                    conn.execute('UPDATE usage SET total_bytes = total_bytes - ? WHERE id = 0', (freed,))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"Result cache invalidation error: {e}")
+
+    def clear(self):
+        """Remove every entry"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM entries')
+        conn.execute('UPDATE usage SET total_bytes = 0 WHERE id = 0')
+        conn.execute('COMMIT')
+
+    def stats(self):
+        """Return this process's hit/miss counters"""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -1,18 +1,58 @@
-from flask import request, jsonify, render_template
+import os
+import time
+from flask import request, jsonify, render_template, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from .auth import register_auth_routes
+from .fast_json import encode_query_response
+from .ingest import register_ingest_routes
 from .query_processor import QueryProcessor
+from .result_cache import SharedResultCache
+from .sharding import ShardRouter
+from .subscriptions import register_subscription_routes
+from .recorder import WorkloadRecorder
+from .warmup import warmup_stats
 
-# Initialize the query processor
-query_processor = QueryProcessor()
+# Shared query processor, built on first use by get_query_processor()
+query_processor = None
+
+def get_query_processor():
+    """Return the process-wide query processor, creating it on first use"""
+    global query_processor
+    if query_processor is None:
+        # Use the host-wide result cache
+        query_processor = QueryProcessor(result_cache=SharedResultCache.from_env(),
+                                         coalesce_timeout=float(os.environ.get('COALESCE_TIMEOUT', 30)),
+                                         shard_router=ShardRouter.from_env(),
+                                         compound_workers=int(os.environ.get('COMPOUND_WORKERS', 4)))
+    return query_processor
 
 def register_routes(app):
+    query_processor = get_query_processor()
+    
+    # Optional workload log of /query, /explain and /validate traffic
+    recorder = WorkloadRecorder.from_env()
+    
+    def count_rows(result):
+        return len(result["data"]) if result.get("success") and isinstance(result.get("data"), list) else None
+    
+    def record(endpoint, started, query_text, query_data, rows=None, tenant=None):
+        if recorder is not None:
+            recorder.record(endpoint, get_jwt_identity(), query_text, query_data.get("sql"),
+                            time.perf_counter() - started, rows, tenant)
+    
     # Register authentication routes
     register_auth_routes(app)
     
+    # Register bulk ingest routes
+    register_ingest_routes(app, query_processor)
+    
+    # Register live query subscriptions
+    register_subscription_routes(app, query_processor)
+    
     @app.route('/query', methods=['POST'])
     @jwt_required()
     def process_query():
+        started = time.perf_counter()
         if not request.is_json:
             return jsonify({"error": "Missing JSON in request"}), 400
         
@@ -20,24 +60,66 @@ def register_routes(app):
         if not query_text:
             return jsonify({"error": "Missing query parameter"}), 400
         
-        # Process the query
+        # Optional tenant, when reads are served from sharded data
+        tenant = request.json.get('tenant')
+        if tenant is not None and query_processor.shard_router is None:
+            return jsonify({"error": "Sharding is not enabled; tenant is not supported"}), 400
+        
+        # Process the query, splitting compound questions into independent parts
+        sub_queries = query_processor.split_compound_query(query_text)
+        if len(sub_queries) > 1:
+            return process_compound_query(started, query_text, sub_queries, tenant)
         query_data = query_processor.process_query(query_text)
         
-        # Execute the query
-        result = query_processor.execute_query(query_data)
+        # Unchanged result: skip execution and serialization entirely
+        etag = query_processor.result_etag(query_data, tenant=tenant)
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+            rows = None
+        else:
+            # Execute the query, with rows encoded straight to JSON bytes
+            results, rows = query_processor.execute_query_encoded(query_data, tenant=tenant)
+            
+            # Combine the query data and results
+            response = make_response(encode_query_response(query_text, query_data, results))
+            response.mimetype = 'application/json'
+        
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        record('/query', started, query_text, query_data, rows, tenant)
+        return response
+    
+    def process_compound_query(started, query_text, sub_queries, tenant):
+        parts = [query_processor.process_query(sub_query) for sub_query in sub_queries]
         
-        # Combine the query data and results
-        response = {
-            "query": query_text,
-            "parsed_query": query_data,
-            "results": result
-        }
+        etag = query_processor.compound_etag(parts, tenant=tenant)
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+            rows = None
+        else:
+            # The parts run concurrently, so this takes about as long as the slowest one
+            results = query_processor.execute_compound(parts, tenant=tenant)
+            counts = [count_rows(result) for result in results]
+            rows = sum(counts) if None not in counts else None
+            
+            response = jsonify({
+                "query": query_text,
+                "compound": True,
+                "parts": [
+                    {"query": sub_query, "parsed_query": query_data, "results": result}
+                    for sub_query, query_data, result in zip(sub_queries, parts, results)
+                ]
+            })
         
-        return jsonify(response), 200
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        record('/query', started, query_text, {"sql": "; ".join(part["sql"] for part in parts)}, rows, tenant)
+        return response
     
     @app.route('/explain', methods=['POST'])
     @jwt_required()
     def explain_query():
+        started = time.perf_counter()
         if not request.is_json:
             return jsonify({"error": "Missing JSON in request"}), 400
         
@@ -62,12 +144,14 @@ def register_routes(app):
         response = {
             "explanation": explanation
         }
+        record('/explain', started, request.json.get('query'), query_data)
         
         return jsonify(response), 200
     
     @app.route('/validate', methods=['POST'])
     @jwt_required()
     def validate_query():
+        started = time.perf_counter()
         if not request.is_json:
             return jsonify({"error": "Missing JSON in request"}), 400
         
@@ -86,19 +170,30 @@ def register_routes(app):
         else:
             return jsonify({"error": "Missing query or parsed_query parameter"}), 400
         
+        # Validate against the tenant's shard when reads are sharded
+        tenant = request.json.get('tenant')
+        if tenant is not None and query_processor.shard_router is None:
+            return jsonify({"error": "Sharding is not enabled; tenant is not supported"}), 400
+        
         # Validate the query
-        validation = query_processor.validate_query(query_data)
+        validation = query_processor.validate_query(query_data, tenant=tenant)
         
         response = {
             "validation": validation
         }
+        record('/validate', started, request.json.get('query'), query_data, tenant=tenant)
         
         return jsonify(response), 200
     
     # Add a simple health check endpoint
     @app.route('/health', methods=['GET'])
     def health_check():
-        return jsonify({"status": "healthy"}), 200
+        return jsonify({
+            "status": "healthy",
+            "warmup": warmup_stats(),
+            "query_stats": query_processor.stats(),
+            "subscriptions": app.extensions['subscriptions'].stats()
+        }), 200
         
     # Add a welcome page for the root URL
     @app.route('/', methods=['GET'])
@@ -115,6 +210,8 @@ def register_routes(app):
                 "/query": "Process natural language queries (POST)",
                 "/explain": "Get explanation of a query (POST)",
                 "/validate": "Validate a query (POST)",
+                "/ingest/<table>": "Bulk load NDJSON or CSV rows (POST, admin)",
+                "/subscribe": "Stream live query results over Server-Sent Events (GET)",
                 "/health": "Check API health (GET)"
             },
             "version": "1.0.0"
@@ -0,0 +1,219 @@
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .database import SCHEMA, build_insert_sql, create_tables
+
+# Single-aggregate statements produced by QueryProcessor.process_query
+_AGGREGATE_PATTERN = re.compile(r'^\s*SELECT\s+(COUNT|SUM|AVG|MAX|MIN)\((.*?)\)\s+(FROM\s.*)$', re.IGNORECASE | re.DOTALL)
+_ORDER_PATTERN = re.compile(r'\bORDER\s+BY\s+([A-Za-z_][A-Za-z0-9_]*)(?:\s+(ASC|DESC))?', re.IGNORECASE)
+_LIMIT_PATTERN = re.compile(r'\bLIMIT\s+(\d+)\s*$', re.IGNORECASE)
+
+def _read_header(path, size):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(size)
+    except FileNotFoundError:
+        return b''
+
+def _file_version(path):
+    """
+    Describe a shard file's state, so any committed write changes it.
+
+    Size and mtime alone miss in-place updates within the clock's resolution
+    and WAL commits, which leave the main file untouched. SQLite bumps the file
+    change counter (header bytes 24-27) on every commit in rollback mode; in WAL
+    mode the -wal file grows with each commit and gets new salts (header bytes
+    12-23) whenever it restarts from the beginning.
+    """
+    stat = os.stat(path)
+    parts = [os.path.basename(path), str(stat.st_mtime_ns), str(stat.st_size),
+             _read_header(path, 28)[24:28].hex()]
+    try:
+        wal = os.stat(path + '-wal')
+        parts += [str(wal.st_mtime_ns), str(wal.st_size), _read_header(path + '-wal', 24)[12:24].hex()]
+    except FileNotFoundError:
+        pass
+    return ':'.join(parts)
+
+def _query_shard(path, sql, params=()):
+    """Run a read-only query against one shard file (runs in a pool process)"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(sql, params)
+        columns = [description[0] for description in cursor.description]
+        return columns, cursor.fetchall()
+    finally:
+        conn.close()
+
+class ShardRouter:
+    """
+    Routes queries to SQLite shard files and merges partial results.
+
+    A directory holds per-tenant files (tenant_<name>.sqlite) and/or hash
+    partitions (shard_<n>.sqlite). A query for a tenant reads that tenant's file;
+    any other query fans out across every file on a process pool, and
+    COUNT/SUM/AVG/MAX/MIN results are combined from per-shard partials
+    (AVG as SUM and COUNT).
+    """
+
+    def __init__(self, directory, processes=None):
+        self.directory = directory
+        self.processes = processes or os.cpu_count() or 1
+        self._pool = None
+        self._pool_pid = None
+
+    @classmethod
+    def from_env(cls):
+        """Build a router for SHARD_DIR, or None if sharding is not configured"""
+        directory = os.environ.get('SHARD_DIR')
+        if not directory:
+            return None
+        processes = os.environ.get('SHARD_PROCESSES')
+        return cls(directory, int(processes) if processes else None)
+
+    def tenant_path(self, tenant):
+        """Return the shard file for a tenant"""
+        if not re.match(r'^[A-Za-z0-9_-]+$', str(tenant)):
+            raise ValueError(f"Invalid tenant name '{tenant}'")
+        return os.path.join(self.directory, f"tenant_{tenant}.sqlite")
+
+    def partition_path(self, index):
+        """Return the file for hash partition `index`"""
+        return os.path.join(self.directory, f"shard_{index:03d}.sqlite")
+
+    def shard_paths(self, tenant=None):
+        """Return the files a query for `tenant` (or for everyone) has to read"""
+        if tenant is not None:
+            path = self.tenant_path(tenant)
+            if not os.path.exists(path):
+                raise ValueError(f"Unknown tenant '{tenant}'")
+            return [path]
+        return sorted(glob.glob(os.path.join(self.directory, '*.sqlite')))
+
+    def data_version(self, tenant=None):
+        """Return a version string that changes whenever any shard file read by the query changes"""
+        parts = [_file_version(path) for path in self.shard_paths(tenant)]
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+    def create_partitions(self, count):
+        """Create `count` empty hash partitions with the app's schema"""
+        os.makedirs(self.directory, exist_ok=True)
+        for index in range(count):
+            conn = sqlite3.connect(self.partition_path(index))
+            create_tables(conn)
+            conn.close()
+
+    def create_tenant(self, tenant):
+        """Create an empty shard file for a tenant"""
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.tenant_path(tenant))
+        create_tables(conn)
+        conn.close()
+
+    def load(self, table, rows, tenant=None):
+        """Insert rows (tuples in SCHEMA column order) into a tenant's file, or hash-partition them by id"""
+        columns = [name for name, _, _ in SCHEMA[table]]
+        sql = build_insert_sql(table, columns)
+        if tenant is not None:
+            paths = [self.tenant_path(tenant)]
+        else:
+            paths = sorted(glob.glob(os.path.join(self.directory, 'shard_*.sqlite')))
+            if not paths:
+                raise ValueError("No hash partitions; call create_partitions() first")
+
+        batches = [[] for _ in paths]
+        for position, row in enumerate(rows):
+            # Partition on id; rows without one are spread round-robin
+            key = row[0] if isinstance(row[0], int) else position
+            batches[key % len(paths)].append(row)
+        for path, batch in zip(paths, batches):
+            conn = sqlite3.connect(path)
+            with conn:
+                conn.executemany(sql, batch)
+            conn.close()
+
+    def _executor(self):
+        # Spawned rather than forked: the web worker is multithreaded
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.processes,
+                                             mp_context=multiprocessing.get_context('spawn'))
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def execute_query(self, sql, params=(), tenant=None):
+        """Run a read query on the relevant shards and return merged rows as dicts"""
+        paths = self.shard_paths(tenant)
+        if not paths:
+            return []
+        if len(paths) == 1:
+            columns, rows = _query_shard(paths[0], sql, params)
+            return [dict(zip(columns, row)) for row in rows]
+
+        aggregate = _AGGREGATE_PATTERN.match(sql)
+        if aggregate:
+            return self._fan_out_aggregate(paths, sql, params, aggregate)
+        return self._fan_out_rows(paths, sql, params)
+
+    def _map(self, paths, sql, params):
+        executor = self._executor()
+        futures = [executor.submit(_query_shard, path, sql, params) for path in paths]
+        return [future.result() for future in futures]
+
+    def _fan_out_aggregate(self, paths, sql, params, aggregate):
+        function, expression, rest = aggregate.group(1).upper(), aggregate.group(2), aggregate.group(3)
+        # Keep the column name a single SQLite query would have produced
+        column = f"{aggregate.group(1)}({expression})"
+
+        if function == 'AVG':
+            # An average of averages is wrong; combine sums and counts instead
+            partial_sql = f"SELECT SUM({expression}), COUNT({expression}) {rest}"
+        else:
+            partial_sql = sql
+        partials = [rows[0] for _, rows in self._map(paths, partial_sql, params) if rows]
+
+        if function == 'AVG':
+            total = sum(row[0] for row in partials if row[0] is not None)
+            count = sum(row[1] for row in partials)
+            value = total / count if count else None
+        else:
+            values = [row[0] for row in partials if row[0] is not None]
+            if function == 'COUNT':
+                value = sum(values)
+            elif not values:
+                value = None
+            elif function == 'SUM':
+                value = sum(values)
+            elif function == 'MAX':
+                value = max(values)
+            else:
+                value = min(values)
+        return [{column: value}]
+
+    def _fan_out_rows(self, paths, sql, params):
+        results = self._map(paths, sql, params)
+        columns = results[0][0]
+        rows = [row for _, shard_rows in results for row in shard_rows]
+
+        # Each shard applied ORDER BY/LIMIT locally; apply them again to the union
+        order = _ORDER_PATTERN.search(sql)
+        if order and order.group(1) in columns:
+            index = columns.index(order.group(1))
+            descending = (order.group(2) or 'ASC').upper() == 'DESC'
+            present = [row for row in rows if row[index] is not None]
+            missing = [row for row in rows if row[index] is None]
+            # SQLite sorts NULLs first ascending and last descending
+            rows = sorted(present, key=lambda row: row[index], reverse=descending)
+            rows = rows + missing if descending else missing + rows
+        limit = _LIMIT_PATTERN.search(sql)
+        if limit:
+            rows = rows[:int(limit.group(1))]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def close(self):
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown()
+        self._pool = None
@@ -0,0 +1,238 @@
+import json
+import os
+import queue
+import threading
+from collections import Counter
+from flask import Response, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from .database import TABLES, add_change_listener, tables_in_sql
+
+# Seconds between keepalive comments on an idle stream
+KEEPALIVE_SECONDS = 15
+# Events buffered per subscriber before it is resynced with a full result
+MAX_PENDING_EVENTS = 32
+# Seconds between checks of the shard files, which change without a local write
+SHARD_POLL_SECONDS = 2.0
+
+class SubscriptionLimitError(Exception):
+    """Raised when an identity already holds the maximum number of subscriptions"""
+
+class SubscriptionCapacityError(Exception):
+    """Raised when this worker has no thread left to hold another stream"""
+
+class Subscription:
+    """One client's stream of results for a query"""
+
+    def __init__(self, identity, group):
+        self.identity = identity
+        self.group = group
+        self.events = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+
+    def push(self, event, payload):
+        try:
+            self.events.put_nowait((event, payload))
+        except queue.Full:
+            # A slow client skips the backlog and gets the latest full result
+            while True:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    break
+            self.events.put_nowait(('result', self.group.full_payload()))
+
+class _QueryGroup:
+    """All subscriptions to the same SQL, evaluated once per change"""
+
+    def __init__(self, query_text, query_data):
+        self.query_text = query_text
+        self.query_data = query_data
+        self.tables = set(tables_in_sql(query_data["sql"]))
+        self.is_select = query_data.get("operation") == "select"
+        self.subscribers = set()
+        self.result = None
+
+    def full_payload(self):
+        return {"query": self.query_text, "parsed_query": self.query_data, "results": self.result}
+
+class SubscriptionManager:
+    """
+    Keeps live query subscriptions up to date.
+
+    Identical queries share one evaluation. A query is only re-evaluated after a
+    write to a table it reads (or, when reads are sharded, after the shard files
+    change); subscribers then receive the new result, or for select queries just
+    the rows added and removed. Limits apply per worker process.
+    """
+
+    def __init__(self, processor, max_per_identity=5, max_streams=8, poll_interval=SHARD_POLL_SECONDS):
+        self.processor = processor
+        self.max_per_identity = max_per_identity
+        self.max_streams = max_streams
+        self.poll_interval = poll_interval
+        self.evaluations = 0
+        self._lock = threading.Lock()
+        self._groups = {}
+        self._per_identity = Counter()
+        self._changed = set()
+        self._wakeup = threading.Event()
+        self._notifier_pid = None
+        self._shard_version = None
+        add_change_listener(self._on_change)
+
+    def subscribe(self, identity, query_text):
+        """Register a subscription; its first event is the current result"""
+        query_data = self.processor.process_query(query_text)
+        sql = query_data["sql"]
+        self._ensure_notifier()
+
+        with self._lock:
+            # Each open stream holds one of the worker's threads
+            if sum(self._per_identity.values()) >= self.max_streams:
+                raise SubscriptionCapacityError("No subscription slots left on this worker; retry later")
+            if self._per_identity[identity] >= self.max_per_identity:
+                raise SubscriptionLimitError(f"At most {self.max_per_identity} subscriptions per user")
+            self._per_identity[identity] += 1
+            group = self._groups.get(sql)
+            if group is None:
+                group = self._groups[sql] = _QueryGroup(query_text, query_data)
+            subscription = Subscription(identity, group)
+            group.subscribers.add(subscription)
+            needs_result = group.result is None
+
+        if needs_result:
+            self._evaluate(group)
+        subscription.push('result', group.full_payload())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            group = subscription.group
+            group.subscribers.discard(subscription)
+            if not group.subscribers and self._groups.get(group.query_data["sql"]) is group:
+                del self._groups[group.query_data["sql"]]
+            self._per_identity[subscription.identity] -= 1
+            if self._per_identity[subscription.identity] <= 0:
+                del self._per_identity[subscription.identity]
+
+    def _on_change(self, tables):
+        # Runs on the writer's thread, so just note the change and hand off
+        with self._lock:
+            self._changed.update(tables)
+        self._wakeup.set()
+
+    def _ensure_notifier(self):
+        if self._notifier_pid == os.getpid():
+            return
+        with self._lock:
+            if self._notifier_pid != os.getpid():
+                self._notifier_pid = os.getpid()
+                if self.processor.shard_router is not None:
+                    # Baseline before the first evaluation so no change is missed
+                    self._poll_shards()
+                threading.Thread(target=self._notify_loop, name='subscriptions', daemon=True).start()
+
+    def _poll_shards(self):
+        """Treat every table as changed when the shard files have moved on"""
+        try:
+            version = self.processor.shard_router.data_version()
+        except (ValueError, OSError) as e:
+            print(f"Subscription shard poll error: {e}")
+            return
+        if self._shard_version is not None and version != self._shard_version:
+            with self._lock:
+                self._changed.update(TABLES)
+        self._shard_version = version
+
+    def _notify_loop(self):
+        sharded = self.processor.shard_router is not None
+        while True:
+            # Shard files are written by other processes, so poll them
+            self._wakeup.wait(self.poll_interval if sharded else None)
+            self._wakeup.clear()
+            if sharded:
+                self._poll_shards()
+            with self._lock:
+                changed, self._changed = self._changed, set()
+                groups = [group for group in self._groups.values() if group.tables & changed]
+            for group in groups:
+                try:
+                    self._refresh(group)
+                except Exception as e:
+                    print(f"Subscription refresh error: {e}")
+
+    def _evaluate(self, group):
+        result = self.processor.execute_query(group.query_data)
+        with self._lock:
+            self.evaluations += 1
+            previous, group.result = group.result, result
+            subscribers = list(group.subscribers)
+        return previous, result, subscribers
+
+    def _refresh(self, group):
+        previous, result, subscribers = self._evaluate(group)
+        if result == previous:
+            return
+
+        if group.is_select and previous and previous.get("success") and result.get("success"):
+            delta = _row_delta(previous["data"], result["data"])
+            event, payload = 'delta', {"query": group.query_text, **delta}
+        else:
+            event, payload = 'result', group.full_payload()
+        for subscription in subscribers:
+            subscription.push(event, payload)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscriptions": sum(len(group.subscribers) for group in self._groups.values()),
+                "distinct_queries": len(self._groups),
+                "evaluations": self.evaluations
+            }
+
+def _row_delta(old_rows, new_rows):
+    """Return the rows added and removed between two results, treating rows as a multiset"""
+    def key(row):
+        return json.dumps(row, sort_keys=True)
+    old_counts = Counter(key(row) for row in old_rows)
+    new_counts = Counter(key(row) for row in new_rows)
+    added = [json.loads(row) for row in (new_counts - old_counts).elements()]
+    removed = [json.loads(row) for row in (old_counts - new_counts).elements()]
+    return {"added": added, "removed": removed}
+
+def register_subscription_routes(app, query_processor):
+    manager = SubscriptionManager(query_processor,
+                                  int(os.environ.get('MAX_SUBSCRIPTIONS_PER_IDENTITY', 5)),
+                                  int(os.environ.get('SUBSCRIPTION_THREADS', 8)),
+                                  float(os.environ.get('SHARD_POLL_SECONDS', SHARD_POLL_SECONDS)))
+    app.extensions['subscriptions'] = manager
+
+    # EventSource can't send headers, so the token may also come as ?jwt=...
+    @app.route('/subscribe', methods=['GET'])
+    @jwt_required(locations=['headers', 'query_string'])
+    def subscribe():
+        query_text = request.args.get('query', '')
+        if not query_text:
+            return jsonify({"error": "Missing query parameter"}), 400
+
+        try:
+            subscription = manager.subscribe(get_jwt_identity(), query_text)
+        except SubscriptionLimitError as e:
+            return jsonify({"error": str(e)}), 429
+        except SubscriptionCapacityError as e:
+            return jsonify({"error": str(e)}), 503, {'Retry-After': str(KEEPALIVE_SECONDS)}
+
+        def stream():
+            try:
+                while True:
+                    try:
+                        event, payload = subscription.events.get(timeout=KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+            finally:
+                # Runs when the client disconnects and the server closes the stream
+                manager.unsubscribe(subscription)
+
+        return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
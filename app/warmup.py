@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+# Extra seconds start_warmup() waits past the budget for the query in flight
+WAIT_GRACE = 5.0
+
+# Ranked list of popular queries shipped with the app
+DEFAULT_QUERIES_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'warmup_queries.txt'))
+
+def load_popular_queries(path, limit=50):
+    """
+    Load up to `limit` queries, most popular first.
+
+    A .jsonl/.ndjson file is treated as a recorded query log and ranked by how
+    often each "query" appears; any other file lists one query per line in rank
+    order, with blank lines and # comments ignored.
+    """
+    if not path or not os.path.exists(path):
+        return []
+
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            counts = Counter()
+            for line in f:
+                try:
+                    query = json.loads(line).get('query')
+                except (ValueError, AttributeError):
+                    continue
+                if query:
+                    counts[query] += 1
+            return [query for query, _ in counts.most_common(limit)]
+
+        queries = []
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and line not in queries:
+                queries.append(line)
+        return queries[:limit]
+
+class Warmup:
+    """Pre-parses and executes popular queries on a background thread within a time budget"""
+
+    def __init__(self, processor, queries, budget=2.0):
+        self.processor = processor
+        self.queries = queries
+        self.budget = budget
+        self.status = 'cold'
+        self.warmed = 0
+        self.elapsed = 0.0
+        self._thread = None
+
+    def start(self):
+        """Start warming in the background"""
+        if not self.queries:
+            self.status = 'warm'
+            return self
+        self.status = 'warming'
+        self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until warmup finishes or `timeout` seconds pass"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.status
+
+    def _run(self):
+        started = time.perf_counter()
+        deadline = started + self.budget
+        try:
+            for query_text in self.queries:
+                if time.perf_counter() >= deadline:
+                    break
+                # Parsing fills the parse cache; executing compiles the statement on
+                # the connection and publishes the result to the result cache.
+                # Compound queries are warmed part by part, the way /query runs them.
+                # Sharded reads are only parsed: running them would start the
+                # shard process pool in the gunicorn master before it forks.
+                for part in self.processor.split_compound_query(query_text):
+                    query_data = self.processor.process_query(part)
+                    if self.processor.shard_router is None:
+                        self.processor.execute_query(query_data)
+                self.warmed += 1
+        except Exception as e:
+            print(f"Warmup error: {e}")
+        self.elapsed = time.perf_counter() - started
+        self.status = 'warm' if self.warmed == len(self.queries) else 'partial'
+        print(f"Warmup finished: {self.warmed}/{len(self.queries)} queries in {self.elapsed:.3f}s")
+
+    def stats(self):
+        """Return warmup progress for /health"""
+        return {
+            "status": self.status,
+            "queries_warmed": self.warmed,
+            "queries_total": len(self.queries),
+            "elapsed_seconds": round(self.elapsed, 4)
+        }
+
+# Warmup for this process, started by start_warmup()
+warmup = None
+
+def start_warmup(processor):
+    """Warm the processor from WARMUP_QUERIES, stopping after WARMUP_BUDGET seconds"""
+    global warmup
+    if warmup is None:
+        budget = float(os.environ.get('WARMUP_BUDGET', 2.0))
+        queries = load_popular_queries(os.environ.get('WARMUP_QUERIES', DEFAULT_QUERIES_PATH),
+                                       int(os.environ.get('WARMUP_LIMIT', 50)))
+        warmup = Warmup(processor, queries, budget).start()
+        # The loop stops starting queries at the budget, so this returns once
+        # the query in flight finishes. Waiting for the thread to exit matters
+        # under preload_app: gunicorn must not fork while it is mid-query and
+        # holding the parse, coalescer or version locks. A query that hangs
+        # must not hold up startup forever, though.
+        if warmup.wait(budget + WAIT_GRACE) == 'warming':
+            print(f"Warmup still running after {budget + WAIT_GRACE:.1f}s; starting anyway")
+    return warmup
+
+def warmup_stats():
+    """Return this process's warmup status, or cold if it never started"""
+    if warmup is None:
+        return {"status": "cold", "queries_warmed": 0, "queries_total": 0, "elapsed_seconds": 0.0}
+    return warmup.stats()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark the host-wide result cache across several worker processes.
+
+Loads a larger sales table once in the parent, then forks worker processes the
+way gunicorn's preload does, so every worker serves identical data. Each worker
+replays the same skewed mix of queries with no cache, with its own private cache
+file, and with one cache file shared by all workers.
+
+Usage: python benchmarks/bench_result_cache.py [--workers 4] [--requests 500] [--rows 200000]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import init_db
+from app.ingest import ingest_rows
+from app.query_processor import QueryProcessor
+from app.result_cache import SharedResultCache
+
+QUERIES = [
+    "What is the total sales amount?",
+    "Count all sales",
+    "What is the average sale price?",
+    "What is the highest sale?",
+    "What is the lowest sale?",
+    "Total sales last month",
+    "Total sales this year",
+    "Count all sales last year",
+    "Average sales this month",
+    "Show me all sales",
+    "Count all customers",
+    "What is the average product price?",
+    "What is the most expensive product?",
+    "What is the cheapest product in Electronics?",
+    "Show me all products under $100",
+    "Count all products in Clothing",
+]
+
+def load_sales(rows):
+    """Append generated sales rows to the in-memory database"""
+    records = ((i, {"customer_id": 1 + i % 5, "product_id": 1 + i % 8, "quantity": 1 + i % 3,
+                    "sale_date": f"2023-{1 + i % 12:02d}-{1 + i % 28:02d}", "total_price": float(10 + i % 500)})
+               for i in range(rows))
+    ingest_rows('sales', records, batch_size=5000, transaction_rows=rows + 1)
+
+def run_worker(args):
+    mode, cache_path, requests, seed = args
+    cache = SharedResultCache(cache_path) if mode != 'none' else None
+    processor = QueryProcessor(result_cache=cache)
+    parsed = [processor.process_query(text) for text in QUERIES]
+    # Zipf-like popularity: the first queries are asked far more often
+    weights = [1.0 / (rank + 1) for rank in range(len(parsed))]
+    rng = random.Random(seed)
+
+    latencies = []
+    for query_data in rng.choices(parsed, weights=weights, k=requests):
+        started = time.perf_counter()
+        processor.execute_query(query_data)
+        latencies.append(time.perf_counter() - started)
+    stats = cache.stats() if cache is not None else {"hits": 0, "misses": 0}
+    return latencies, stats["hits"], stats["misses"]
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def run_mode(mode, workers, requests, directory):
+    if mode == 'shared':
+        paths = [os.path.join(directory, 'shared.sqlite')] * workers
+    else:
+        paths = [os.path.join(directory, f'worker{i}.sqlite') for i in range(workers)]
+    jobs = [(mode, paths[i], requests, i) for i in range(workers)]
+
+    context = multiprocessing.get_context('fork')
+    started = time.perf_counter()
+    with context.Pool(workers) as pool:
+        results = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for result in results for latency in result[0]]
+    hits = sum(result[1] for result in results)
+    misses = sum(result[2] for result in results)
+    return {
+        "mode": mode,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "throughput": len(latencies) / elapsed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=500, help='requests per worker')
+    parser.add_argument('--rows', type=int, default=200000, help='extra sales rows to load')
+    args = parser.parse_args()
+
+    init_db()
+    load_sales(args.rows)
+
+    print(f"{args.workers} workers x {args.requests} requests, {args.rows} extra sales rows")
+    print(f"{'mode':<10}{'hit rate':>10}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'req/s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('none', 'private', 'shared'):
+            result = run_mode(mode, args.workers, args.requests, directory)
+            print(f"{result['mode']:<10}{result['hit_rate']:>10.1%}{result['p50_ms']:>10.3f}"
+                  f"{result['p95_ms']:>10.3f}{result['mean_ms']:>10.3f}{result['throughput']:>10.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Benchmark result serialization for /query: dict rows + json.dumps versus tuple
+rows encoded straight to bytes.
+
+Loads a sales table of the largest requested size into the in-memory database,
+then for each size runs `SELECT * FROM sales LIMIT <size>` through both paths and
+reports throughput (best of --repeat) and peak Python memory (a separate
+tracemalloc pass, since tracing slows both paths down). The two outputs are
+checked to decode to the same value.
+
+Usage: python benchmarks/bench_serialization.py [--sizes 1000,100000,1000000] [--repeat 3]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import execute_query, execute_query_fast, init_db
+from app.fast_json import encode_results
+from app.ingest import ingest_rows
+
+def load_sales(rows):
+    """Replace the sales table with generated rows"""
+    execute_query("DELETE FROM sales")
+    records = ((i, {"id": i + 1, "customer_id": 1 + i % 5, "product_id": 1 + i % 8, "quantity": 1 + i % 3,
+                    "sale_date": f"2023-{1 + i % 12:02d}-{1 + i % 28:02d}", "total_price": 10 + (i % 5000) / 7})
+               for i in range(rows))
+    ingest_rows('sales', records, batch_size=5000, transaction_rows=rows + 1)
+
+def dict_path(sql):
+    """The previous /query path: rows as dicts, then json.dumps with sorted keys"""
+    return json.dumps({"data": execute_query(sql), "success": True}, sort_keys=True).encode('utf-8')
+
+def tuple_path(sql):
+    """The fast path: rows as tuples, encoded a column at a time"""
+    return encode_results(execute_query_fast(sql))
+
+def measure(function, sql, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        function(sql)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def peak_memory(function, sql):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function(sql)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='comma-separated row counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    init_db()
+    print(f"Loading {max(sizes)} sales rows...")
+    load_sales(max(sizes))
+
+    print(f"{'rows':>10}{'path':>8}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}{'speedup':>9}")
+    for size in sizes:
+        sql = f"SELECT * FROM sales LIMIT {size}"
+        if json.loads(dict_path(sql)) != json.loads(tuple_path(sql)):
+            sys.exit(f"Outputs differ at {size} rows")
+
+        baseline = None
+        for name, function in (('dict', dict_path), ('tuple', tuple_path)):
+            seconds = measure(function, sql, args.repeat)
+            peak = peak_memory(function, sql) / (1024 * 1024)
+            baseline = baseline or seconds
+            print(f"{size:>10}{name:>8}{seconds:>10.3f}{size / seconds:>12,.0f}{peak:>10.1f}{baseline / seconds:>8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Benchmark cross-shard aggregates against one SQLite file as the process pool grows.
+
+Generates --rows sales rows, stores them once in a single file and once hash
+partitioned over --shards files, then times the COUNT/SUM/AVG/MAX/MIN queries
+produced by QueryProcessor.process_query with 1, 2, 4, ... pool processes up to
+the machine's core count.
+
+Usage: python benchmarks/bench_sharding.py [--rows 1000000] [--shards 8] [--repeat 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.query_processor import QueryProcessor
+from app.sharding import ShardRouter
+
+QUERIES = [
+    "Count all sales",
+    "What is the total sales amount?",
+    "What is the average of all sales?",
+    "What is the highest sale?",
+    "What is the lowest sale?",
+]
+
+def generate_sales(rows):
+    for i in range(1, rows + 1):
+        yield (i, 1 + i % 5, 1 + i % 8, 1 + i % 3, f"2023-{1 + i % 12:02d}-{1 + i % 28:02d}", float(10 + i % 997))
+
+def time_query(processor, query_data, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = processor.execute_query(query_data)
+        samples.append(time.perf_counter() - started)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+    return statistics.median(samples), result["data"][0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--shards', type=int, default=max(8, os.cpu_count() or 1))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    pool_sizes = sorted({1, cores} | {2 ** n for n in range(1, cores.bit_length()) if 2 ** n <= cores})
+
+    with tempfile.TemporaryDirectory() as directory:
+        single = ShardRouter(os.path.join(directory, 'single'))
+        single.create_partitions(1)
+        single.load('sales', generate_sales(args.rows))
+
+        sharded_dir = os.path.join(directory, 'sharded')
+        loader = ShardRouter(sharded_dir)
+        loader.create_partitions(args.shards)
+        loader.load('sales', generate_sales(args.rows))
+
+        # Caching would hide the work being measured
+        baseline = QueryProcessor(shard_router=single)
+        parsed = [baseline.process_query(text) for text in QUERIES]
+
+        print(f"{args.rows} sales rows, {args.shards} shards, {cores} cores (median of {args.repeat}, ms)")
+        header = f"{'query':<34}{'1 file':>10}"
+        for size in pool_sizes:
+            header += f"{f'{size} proc':>10}"
+        print(header + f"{'speedup':>10}")
+
+        routers = {size: ShardRouter(sharded_dir, processes=size) for size in pool_sizes}
+        processors = {size: QueryProcessor(shard_router=router) for size, router in routers.items()}
+        for processor in processors.values():
+            # Start the pool before timing
+            processor.execute_query(parsed[0])
+
+        for text, query_data in zip(QUERIES, parsed):
+            base_time, base_value = time_query(baseline, query_data, args.repeat)
+            line = f"{text:<34}{base_time * 1000:>10.1f}"
+            best = base_time
+            for size in pool_sizes:
+                elapsed, value = time_query(processors[size], query_data, args.repeat)
+                merged, expected = list(value.values())[0], list(base_value.values())[0]
+                if abs(merged - expected) > 1e-9 * max(1.0, abs(expected)):
+                    raise RuntimeError(f"Merged result {value} differs from {base_value}")
+                line += f"{elapsed * 1000:>10.1f}"
+                best = min(best, elapsed)
+            print(line + f"{base_time / best:>9.2f}x")
+
+        for router in routers.values():
+            router.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Measure how quickly a worker becomes useful.
+
+"cold" runs a fresh interpreter per sample, the way a worker boots without
+preload_app: it reports the time to import the app package, to run
+create_app(), and to answer the first /auth/login + /query.
+
+"forked" builds the app once in this process and then forks a child per
+sample, the way gunicorn workers boot with preload_app: only the time from
+fork to the first successful /query is left.
+
+Usage: python benchmarks/bench_startup.py [--runs 5]
+"""
+
+import argparse
+import inspect
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+QUERY = "What is the total sales amount?"
+
+COLD_SCRIPT = '''
+import json, time, warnings
+warnings.filterwarnings('ignore')
+started = time.perf_counter()
+from app import create_app
+import flask, flask_jwt_extended, app.routes
+imported = time.perf_counter()
+application = create_app()
+created = time.perf_counter()
+first_query(application)
+answered = time.perf_counter()
+print(json.dumps({"import": imported - started, "create_app": created - imported,
+                  "first_query": answered - created}))
+'''
+
+def first_query(application):
+    """Log in and run one /query through the test client"""
+    client = application.test_client()
+    token = client.post('/auth/login', json={"username": "admin", "password": "password"}).get_json()['token']
+    response = client.post('/query', json={"query": QUERY}, headers={"Authorization": f"Bearer {token}"})
+    if response.status_code != 200 or not response.get_json()['results']['success']:
+        raise RuntimeError(f"First query failed: {response.status_code}")
+
+def cold_sample():
+    source = f"QUERY = {QUERY!r}\n{inspect.getsource(first_query)}\n{COLD_SCRIPT}"
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', source], cwd=ROOT, capture_output=True, text=True, check=True)
+    total = time.perf_counter() - started
+    timings = json.loads(output.stdout.strip().splitlines()[-1])
+    timings["total"] = total
+    return timings
+
+def forked_sample(application):
+    read_fd, write_fd = os.pipe()
+    started = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            first_query(application)
+            os.write(write_fd, b'ok')
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    status = os.read(read_fd, 2)
+    total = time.perf_counter() - started
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    if status != b'ok':
+        raise RuntimeError("Forked worker failed its first query")
+    return {"total": total}
+
+def summarize(samples, key):
+    values = [sample[key] * 1000 for sample in samples]
+    return f"{statistics.median(values):>10.1f}{min(values):>10.1f}{max(values):>10.1f}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    import warnings
+    warnings.filterwarnings('ignore')
+
+    cold = [cold_sample() for _ in range(args.runs)]
+
+    from app import create_app
+    application = create_app()
+    first_query(application)
+    forked = [forked_sample(application) for _ in range(args.runs)]
+
+    print(f"{args.runs} runs per measurement (milliseconds)")
+    print(f"{'phase':<28}{'median':>10}{'min':>10}{'max':>10}")
+    print(f"{'cold: import':<28}{summarize(cold, 'import')}")
+    print(f"{'cold: create_app()':<28}{summarize(cold, 'create_app')}")
+    print(f"{'cold: first /query':<28}{summarize(cold, 'first_query')}")
+    print(f"{'cold: process total':<28}{summarize(cold, 'total')}")
+    print(f"{'forked: fork to /query':<28}{summarize(forked, 'total')}")
+
+if __name__ == '__main__':
+    main()
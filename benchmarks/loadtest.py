@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+"""
+Local load-test harness and gunicorn worker/thread autotuner.
+
+Starts the app under gunicorn for every combination of --workers, --threads and
+--worker-class, replays a weighted mix of /auth/login, /query, /explain and
+/validate traffic at each --concurrency level, and reports throughput and
+p50/p95/p99 latency. The configuration with the best throughput whose p99 stays
+under --p99-target and whose error rate stays under 1% at the highest
+concurrency level is recommended as environment variables for gunicorn.conf.py.
+Each server is configured through those same variables, so gunicorn.conf.py adds
+its SUBSCRIPTION_THREADS stream threads exactly as it will in production. The
+sync worker has no threads to reserve for streams, so it is only swept when
+SUBSCRIPTION_THREADS is 0.
+
+To load-test an already running instance instead, pass --url.
+
+Usage:
+    python benchmarks/loadtest.py --workers 1,2,4 --threads 1,4,8 --worker-class gthread \\
+        --concurrency 8,32 --duration 10 --mix query=70,explain=10,validate=10,login=10
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+QUERIES = [
+    "What is the total sales amount?",
+    "Count all customers",
+    "Show me all sales from last month",
+    "What is the average product price?",
+    "What is the most expensive product?",
+    "What is the cheapest product in Electronics?",
+    "Show me all products under $100",
+    "Count all products in Clothing",
+]
+
+CREDENTIALS = {"username": "admin", "password": "password"}
+
+# Stream threads gunicorn.conf.py adds to every worker on top of GUNICORN_THREADS
+SUBSCRIPTION_THREADS = int(os.environ.get('SUBSCRIPTION_THREADS', 8))
+
+def parse_mix(text):
+    """Parse 'query=70,explain=10' into a list of (endpoint, weight)"""
+    mix = []
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('login', 'query', 'explain', 'validate'):
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' in mix")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+def parse_list(cast):
+    return lambda text: [cast(value) for value in text.split(',') if value]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class Server:
+    """
+    A gunicorn process running the app with the given settings.
+
+    The settings go through the environment variables gunicorn.conf.py reads,
+    not command-line flags, which would override what the config adds to them.
+    Each server gets a result cache file of its own, so no run starts warm from
+    an earlier one, and never records its traffic to a workload log.
+    """
+
+    def __init__(self, workers, threads, worker_class):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.directory = tempfile.mkdtemp(prefix='loadtest-')
+        env = dict(os.environ, RESULT_CACHE_PATH=os.path.join(self.directory, 'results.sqlite'),
+                   WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+                   GUNICORN_WORKER_CLASS=worker_class)
+        env.pop('QUERY_LOG_PATH', None)
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                   '--bind', f"127.0.0.1:{self.port}", '--log-level', 'warning', 'wsgi:application']
+        self.process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def wait_ready(self, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                connection.request('GET', '/health')
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("gunicorn did not become ready")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class Client:
+    """One keep-alive HTTP connection issuing requests from the traffic mix"""
+
+    def __init__(self, url, mix, seed):
+        parsed = urllib.parse.urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.endpoints = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.rng = random.Random(seed)
+        self.connection = None
+        self.token = None
+
+    def _post(self, path, body, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request('POST', path, body=json.dumps(body), headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.connection.close()
+                    self.connection = None
+                return response.status, data
+            except (OSError, http.client.HTTPException):
+                # The server may close idle keep-alive connections; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def login(self):
+        status, data = self._post('/auth/login', CREDENTIALS)
+        if status == 200:
+            self.token = json.loads(data)['token']
+        return status
+
+    def request(self):
+        """Issue one request from the mix and return its HTTP status"""
+        endpoint = self.rng.choices(self.endpoints, weights=self.weights)[0]
+        if endpoint == 'login' or self.token is None:
+            return self.login()
+        return self._post(f"/{endpoint}", {"query": self.rng.choice(QUERIES)}, self.token)[0]
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def run_load(url, mix, concurrency, duration, warmup=1.0):
+    """Drive the server with `concurrency` clients and return latency statistics"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    def loop(seed):
+        client = Client(url, mix, seed)
+        local_latencies = []
+        local_errors = 0
+        while True:
+            started = time.perf_counter()
+            if started >= stop_at:
+                break
+            try:
+                ok = client.request() == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+            finished = time.perf_counter()
+            if started >= measure_from:
+                local_latencies.append(finished - started)
+                local_errors += 0 if ok else 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=loop, args=(seed,)) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    count = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": count,
+        "errors": errors[0],
+        "error_rate": errors[0] / count if count else 1.0,
+        "throughput": count / duration,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+
+def print_result(label, result):
+    print(f"{label:<28}{result['concurrency']:>6}{result['throughput']:>10.0f}{result['p50_ms']:>10.1f}"
+          f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['error_rate']:>9.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='load-test a running instance instead of starting gunicorn')
+    parser.add_argument('--workers', type=parse_list(int), default=[1, 2, multiprocessing.cpu_count()])
+    parser.add_argument('--threads', type=parse_list(int), default=[1, 4, 8])
+    parser.add_argument('--worker-class', type=parse_list(str),
+                        default=['gthread'] if SUBSCRIPTION_THREADS else ['sync', 'gthread'])
+    parser.add_argument('--concurrency', type=parse_list(int), default=[8, 32])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds measured per concurrency level')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('query=70,explain=10,validate=10,login=10'))
+    parser.add_argument('--p99-target', type=float, default=250.0, help='p99 latency budget in milliseconds')
+    args = parser.parse_args()
+
+    header = f"{'configuration':<28}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}"
+
+    if args.url:
+        print(header)
+        for concurrency in args.concurrency:
+            print_result(args.url, run_load(args.url, args.mix, concurrency, args.duration))
+        return
+
+    worker_classes = args.worker_class
+    if SUBSCRIPTION_THREADS and 'sync' in worker_classes:
+        worker_classes = [worker_class for worker_class in worker_classes if worker_class != 'sync']
+        print(f"Skipping the sync worker: it cannot reserve SUBSCRIPTION_THREADS={SUBSCRIPTION_THREADS} "
+              f"threads for streams")
+
+    print(f"{multiprocessing.cpu_count()} CPUs, {args.duration:.0f}s per level")
+    print(header)
+    candidates = []
+    for workers, threads, worker_class in itertools.product(args.workers, args.threads, worker_classes):
+        # The sync worker ignores threads; don't measure the same thing twice
+        if worker_class == 'sync' and threads != 1:
+            continue
+        label = f"{workers}w x {threads}t {worker_class}"
+        if worker_class != 'sync' and SUBSCRIPTION_THREADS:
+            label = f"{workers}w x {threads}+{SUBSCRIPTION_THREADS}t {worker_class}"
+        server = Server(workers, threads, worker_class)
+        try:
+            server.wait_ready()
+            results = [run_load(server.url, args.mix, concurrency, args.duration)
+                       for concurrency in args.concurrency]
+        except RuntimeError as e:
+            print(f"{label:<28}failed: {e}")
+            continue
+        finally:
+            server.stop()
+        for result in results:
+            print_result(label, result)
+        candidates.append(((workers, threads, worker_class), results[-1]))
+
+    acceptable = [(config, result) for config, result in candidates
+                  if result['p99_ms'] <= args.p99_target and result['error_rate'] < 0.01]
+    if not acceptable:
+        print(f"\nNo configuration met p99 <= {args.p99_target:.0f}ms at concurrency {args.concurrency[-1]}; "
+              f"choosing the best throughput regardless")
+        acceptable = candidates
+    if not acceptable:
+        return
+
+    (workers, threads, worker_class), result = max(acceptable, key=lambda item: item[1]['throughput'])
+    print(f"\nRecommended for this machine ({result['throughput']:.0f} req/s, p99 {result['p99_ms']:.1f}ms):")
+    print(f"  WEB_CONCURRENCY={workers} GUNICORN_THREADS={threads} GUNICORN_WORKER_CLASS={worker_class}")
+
+if __name__ == '__main__':
+    main()
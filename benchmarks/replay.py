@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""
+Replay a recorded workload log and compare latency distributions between builds.
+
+Record production traffic by setting QUERY_LOG_PATH on the server, then:
+
+    # re-issue the log against a running instance at original speed
+    python benchmarks/replay.py run queries.jsonl --url http://localhost:5000 --output before.json
+
+    # or start this checkout under gunicorn and replay at 4x speed
+    python benchmarks/replay.py run queries.jsonl --start --speed 4 --output after.json
+
+    # compare the two runs
+    python benchmarks/replay.py compare before.json after.json
+
+Requests are issued at their recorded offsets divided by --speed (0 replays as
+fast as --concurrency allows). A server started with --start gets an empty
+result cache of its own and does not record the replayed traffic, so runs of
+different builds never answer from each other's cached results. Entries recorded from a parsed_query body carry
+no query text and are skipped.
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from loadtest import CREDENTIALS, Server, percentile
+
+def load_log(path):
+    """Return replayable log entries ordered by timestamp, and the number skipped"""
+    entries = []
+    skipped = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if entry.get('query') and entry.get('endpoint') in ('/query', '/explain', '/validate'):
+                entries.append(entry)
+            else:
+                skipped += 1
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries, skipped
+
+class Connections:
+    """One keep-alive connection per replay thread"""
+
+    def __init__(self, url):
+        parsed = urllib.parse.urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self._local = threading.local()
+
+    def post(self, path, body, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                connection.request('POST', path, body=json.dumps(body), headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+def replay(entries, url, speed, concurrency):
+    """Issue every entry and return {endpoint: [latency seconds]} plus an error count"""
+    connections = Connections(url)
+    status, data = connections.post('/auth/login', CREDENTIALS)
+    if status != 200:
+        raise RuntimeError(f"Login failed with status {status}")
+    token = json.loads(data)['token']
+
+    latencies = {}
+    errors = [0]
+    lock = threading.Lock()
+
+    def issue(entry):
+        started = time.perf_counter()
+        try:
+            body = {"query": entry['query']}
+            if entry.get('tenant') is not None:
+                body["tenant"] = entry['tenant']
+            ok = connections.post(entry['endpoint'], body, token)[0] == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+        latency = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.setdefault(entry['endpoint'], []).append(latency)
+            else:
+                errors[0] += 1
+
+    first_ts = entries[0]['ts'] if entries else 0
+    replay_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for entry in entries:
+            if speed > 0:
+                delay = (entry['ts'] - first_ts) / speed - (time.perf_counter() - replay_started)
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(issue, entry)
+    return latencies, errors[0], time.perf_counter() - replay_started
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "mean_ms": statistics.mean(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000
+    }
+
+def command_run(args):
+    entries, skipped = load_log(args.log)
+    if not entries:
+        sys.exit(f"No replayable entries in {args.log}")
+
+    server = None
+    url = args.url
+    if args.start:
+        server = Server(args.workers, args.threads, args.worker_class)
+        server.wait_ready()
+        url = server.url
+    try:
+        latencies, errors, elapsed = replay(entries, url, args.speed, args.concurrency)
+    finally:
+        if server is not None:
+            server.stop()
+
+    everything = [latency for values in latencies.values() for latency in values]
+    report = {
+        "log": args.log,
+        "url": url,
+        "speed": args.speed,
+        "requests": len(entries),
+        "skipped": skipped,
+        "errors": errors,
+        "elapsed_seconds": elapsed,
+        "latencies": latencies,
+        "summary": {"all": summarize(everything),
+                    **{endpoint: summarize(values) for endpoint, values in sorted(latencies.items())}}
+    }
+    print(f"Replayed {len(entries)} requests ({skipped} skipped, {errors} errors) in {elapsed:.1f}s")
+    print_summary(report['summary'])
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f)
+
+def print_summary(summary):
+    print(f"{'endpoint':<12}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, stats in summary.items():
+        print(f"{endpoint:<12}{stats['count']:>8}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+def command_compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['summary']
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)['summary']
+
+    print(f"{'endpoint':<12}{'metric':<8}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for endpoint in baseline:
+        if endpoint not in candidate:
+            continue
+        for metric in ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'):
+            before = baseline[endpoint][metric]
+            after = candidate[endpoint][metric]
+            change = (after - before) / before if before else 0.0
+            print(f"{endpoint:<12}{metric[:-3]:<8}{before:>12.2f}{after:>12.2f}{change:>+10.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='replay a workload log')
+    run.add_argument('log')
+    run.add_argument('--url', default='http://localhost:5000')
+    run.add_argument('--start', action='store_true', help='start this checkout under gunicorn instead of using --url')
+    run.add_argument('--workers', type=int, default=2)
+    run.add_argument('--threads', type=int, default=4, help='request threads per worker (SUBSCRIPTION_THREADS are added on top)')
+    run.add_argument('--worker-class', default='gthread')
+    run.add_argument('--speed', type=float, default=1.0, help='time scale; 2 replays twice as fast, 0 as fast as possible')
+    run.add_argument('--concurrency', type=int, default=32)
+    run.add_argument('--output', help='write latencies and summary to this JSON file')
+    run.set_defaults(handler=command_run)
+
+    compare = subparsers.add_parser('compare', help='compare two replay results')
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+    compare.set_defaults(handler=command_compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == '__main__':
+    main()
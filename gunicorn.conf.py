@@ -1,7 +1,27 @@
+import gc
 import multiprocessing
+import os
 
 # Gunicorn configuration file
-bind = "0.0.0.0:$PORT"
-workers = multiprocessing.cpu_count() * 2 + 1
-threads = 2
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Defaults can be overridden per machine; run benchmarks/loadtest.py to find good values
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+
+# Every open /subscribe stream holds a thread for as long as the client stays
+# connected, so each worker gets this many extra threads reserved for streams;
+# the app refuses streams beyond it rather than starving regular requests
+subscription_threads = int(os.environ.get('SUBSCRIPTION_THREADS', 8))
+threads += subscription_threads
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
 timeout = 60
+
+# Import the app, seed the database and build the query processor once in the
+# master; forked workers inherit that state copy-on-write and boot immediately
+preload_app = True
+
+def when_ready(server):
+    # Move everything the master allocated into the permanent generation so the
+    # workers' garbage collector never touches (and un-shares) those pages
+    gc.freeze()
@@ -132,7 +132,26 @@ document.addEventListener('DOMContentLoaded', function() {
             
             const data = await response.json();
             
-            if (response.ok) {
+            if (response.ok && data.compound) {
+                // Compound queries answer each part separately
+                sqlContainer.innerHTML = data.parts
+                    .map(part => `<div class="sql-code">${part.parsed_query.sql}</div>`)
+                    .join('');
+                // The part text comes from the user, so set it as text, not HTML
+                resultsContainer.innerHTML = '';
+                data.parts.forEach(part => {
+                    const heading = document.createElement('h4');
+                    heading.textContent = part.query;
+                    const body = document.createElement('div');
+                    if (part.results.success) {
+                        body.innerHTML = resultsHTML(part.results.data);
+                    } else {
+                        body.className = 'error';
+                        body.textContent = `Error: ${part.results.error}`;
+                    }
+                    resultsContainer.append(heading, body);
+                });
+            } else if (response.ok) {
                 // Display SQL
                 sqlContainer.innerHTML = `<div class="sql-code">${data.parsed_query.sql}</div>`;
                 
@@ -213,9 +232,13 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Helper function to display results
     function displayResults(results) {
+        resultsContainer.innerHTML = resultsHTML(results);
+    }
+    
+    // Helper function to render results as a table
+    function resultsHTML(results) {
         if (!results || results.length === 0) {
-            resultsContainer.innerHTML = '<p>No results found</p>';
-            return;
+            return '<p>No results found</p>';
         }
         
         // Check if results is an array of objects
@@ -241,10 +264,10 @@ document.addEventListener('DOMContentLoaded', function() {
             });
             
             tableHTML += '</tbody></table>';
-            resultsContainer.innerHTML = tableHTML;
+            return tableHTML;
         } else {
             // Simple display for non-tabular data
-            resultsContainer.innerHTML = `<pre>${JSON.stringify(results, null, 2)}</pre>`;
+            return `<pre>${JSON.stringify(results, null, 2)}</pre>`;
         }
     }
     
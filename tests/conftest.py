@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Keep tests off any host-wide cache, workload log or shard directory
+os.environ['RESULT_CACHE_PATH'] = 'off'
+os.environ['WARMUP_QUERIES'] = ''
+for name in ('QUERY_LOG_PATH', 'SHARD_DIR'):
+    os.environ.pop(name, None)
+
+from app import create_app, database
+
+@pytest.fixture
+def db():
+    """A freshly seeded in-memory database"""
+    database.init_db()
+    return database.get_db_connection()
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app()
+
+@pytest.fixture
+def client(app, db):
+    """A test client for a freshly seeded database, with an admin token"""
+    client = app.test_client()
+    token = client.post('/auth/login', json={"username": "admin", "password": "password"}).json["token"]
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {token}"
+    return client
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from app.coalescing import CoalescingTimeout, QueryCoalescer
+
+def start_leader(coalescer, key, function):
+    """Run function as the leader for key on a thread and wait until it is in flight"""
+    started = threading.Event()
+    outcome = {}
+
+    def wrapped():
+        started.set()
+        return function()
+
+    def run():
+        try:
+            outcome["result"] = coalescer.run(key, wrapped)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    started.wait(5)
+    return thread, outcome
+
+def test_followers_share_the_leaders_result():
+    coalescer = QueryCoalescer()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {"rows": 3}
+
+    thread, outcome = start_leader(coalescer, 'key', slow)
+    results = []
+    followers = [threading.Thread(target=lambda: results.append(coalescer.run('key', slow))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    while coalescer.stats()["coalesced"] < 3:
+        pass
+    release.set()
+    for follower in followers + [thread]:
+        follower.join(5)
+
+    assert calls == [1]
+    assert outcome["result"] == {"rows": 3}
+    assert results == [{"rows": 3}] * 3
+    assert coalescer.stats()["in_flight"] == 0
+
+def test_followers_receive_the_leaders_error():
+    coalescer = QueryCoalescer()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("boom")
+
+    thread, outcome = start_leader(coalescer, 'key', failing)
+    errors = []
+
+    def follow():
+        try:
+            coalescer.run('key', failing)
+        except ValueError as e:
+            errors.append(e)
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    while coalescer.stats()["coalesced"] < 1:
+        pass
+    release.set()
+    follower.join(5)
+    thread.join(5)
+
+    assert isinstance(outcome["error"], ValueError)
+    assert errors == [outcome["error"]]
+    assert coalescer.stats()["errors"] == 1
+    # The failed execution is not remembered; the next caller runs again
+    assert coalescer.run('key', lambda: 'fresh') == 'fresh'
+
+def test_follower_times_out_without_cancelling_the_leader():
+    coalescer = QueryCoalescer()
+    release = threading.Event()
+    thread, outcome = start_leader(coalescer, 'key', lambda: release.wait(5) and 'done')
+
+    with pytest.raises(CoalescingTimeout):
+        coalescer.run('key', lambda: 'unused', timeout=0.01)
+    release.set()
+    thread.join(5)
+
+    assert outcome["result"] == 'done'
+    assert coalescer.stats()["timeouts"] == 1
+
+def test_different_keys_run_separately():
+    coalescer = QueryCoalescer()
+    assert coalescer.run('a', lambda: 1) == 1
+    assert coalescer.run('b', lambda: 2) == 2
+    assert coalescer.stats()["executions"] == 2
@@ -0,0 +1,46 @@
+import json
+
+from app.database import ResultSet, execute_query, execute_query_fast
+from app.fast_json import CHUNK_ROWS, encode_query_response, encode_results, encode_rows
+
+def expected(result_set):
+    return json.dumps(result_set.to_dicts(), sort_keys=True, separators=(',', ':')).encode('ascii')
+
+def test_matches_json_dumps_for_sqlite_values():
+    result_set = ResultSet(['b', 'a', 'c'], [
+        (1, 'plain', 1.5),
+        (-2, 'quotes " and \\ and \n newline', None),
+        (2 ** 70, 'unicode café \U0001f600', 1e-300),
+        (None, '', 10.0),
+    ])
+    assert encode_rows(result_set) == expected(result_set)
+
+def test_mixed_column_types():
+    result_set = ResultSet(['value'], [(1,), ('1',), (1.25,), (None,)])
+    assert encode_rows(result_set) == expected(result_set)
+
+def test_non_finite_floats_are_spelled_like_json():
+    result_set = ResultSet(['x'], [(float('inf'),), (float('-inf'),), (float('nan'),)])
+    assert encode_rows(result_set) == b'[{"x":Infinity},{"x":-Infinity},{"x":NaN}]'
+
+def test_duplicate_and_unusual_column_names():
+    result_set = ResultSet(['n', 'COUNT(*)', 'n', '100%'], [(1, 2, 3, 4)])
+    assert json.loads(encode_rows(result_set)) == [{"n": 3, "COUNT(*)": 2, "100%": 4}]
+    assert encode_rows(result_set) == expected(result_set)
+
+def test_empty_and_chunked_results():
+    assert encode_rows(ResultSet(['a'], [])) == b'[]'
+    result_set = ResultSet(['i', 's'], [(i, str(i)) for i in range(CHUNK_ROWS * 2 + 3)])
+    assert encode_rows(result_set) == expected(result_set)
+
+def test_matches_the_dict_path_on_the_database(db):
+    sql = "SELECT * FROM sales"
+    assert json.loads(encode_results(execute_query_fast(sql))) == {"data": execute_query(sql), "success": True}
+
+def test_query_response_body():
+    body = encode_query_response('total "sales"', {"sql": "SELECT 1", "entity": "sales"}, b'{"data":[],"success":true}')
+    assert json.loads(body) == {
+        "query": 'total "sales"',
+        "parsed_query": {"entity": "sales", "sql": "SELECT 1"},
+        "results": {"data": [], "success": True}
+    }
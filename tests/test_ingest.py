@@ -0,0 +1,133 @@
+import threading
+
+import pytest
+
+from app import database
+from app.ingest import RowError, ingest_rows, parse_csv, parse_ndjson
+
+def customers(count, start=0):
+    for i in range(start, start + count):
+        yield i + 1, {"name": f"Customer {i}", "email": f"customer{i}@example.com", "signup_date": "2024-01-01"}
+
+def count(db, table):
+    return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_ingest_batches_and_commits(db):
+    stats = ingest_rows('customers', customers(7), batch_size=2, transaction_rows=4)
+
+    assert stats["rows_received"] == 7
+    assert stats["rows_written"] == 7
+    assert stats["batches"] == 4
+    assert count(db, 'customers') == 12
+    assert not db.in_transaction
+
+def test_ingest_bumps_data_version(db):
+    before = database.get_data_version(['customers'])
+    ingest_rows('customers', customers(3))
+    assert database.get_data_version(['customers']) != before
+
+def test_aborted_upload_rolls_back_uncommitted_rows(db):
+    def interrupted():
+        yield from customers(4)
+        raise ConnectionError("client disconnected")
+
+    before = database.get_data_version(['customers'])
+    with pytest.raises(ConnectionError):
+        ingest_rows('customers', interrupted(), batch_size=2, transaction_rows=100)
+
+    assert count(db, 'customers') == 5
+    assert database.get_data_version(['customers']) == before
+    assert not db.in_transaction
+
+def test_aborted_upload_keeps_committed_transactions(db):
+    def interrupted():
+        yield from customers(5)
+        raise ConnectionError("client disconnected")
+
+    before = database.get_data_version(['customers'])
+    with pytest.raises(ConnectionError):
+        ingest_rows('customers', interrupted(), batch_size=2, transaction_rows=4)
+
+    # The first window of four rows was committed and versioned; the fifth was dropped
+    assert count(db, 'customers') == 9
+    assert database.get_data_version(['customers']) != before
+
+def test_failed_batch_rolls_back_alone(db):
+    records = [
+        (1, {"name": "Dup", "email": "john@example.com", "signup_date": "2024-01-01"}),
+        (2, {"name": "New", "email": "new@example.com", "signup_date": "2024-01-01"}),
+        (3, {"name": "Other", "email": "other@example.com", "signup_date": "2024-01-01"}),
+    ]
+    stats = ingest_rows('customers', records, batch_size=2)
+
+    assert stats["failed_batches"] == 1
+    assert stats["rows_written"] == 1
+    assert stats["rows_rejected"] == 2
+    assert "UNIQUE" in stats["errors"][0]["error"]
+    assert count(db, 'customers') == 6
+
+def test_invalid_rows_are_reported_with_line_numbers(db):
+    records = [(1, {"name": "No email", "signup_date": "2024-01-01"}), (2, RowError("Invalid JSON: x"))]
+    stats = ingest_rows('customers', records)
+
+    assert stats["rows_rejected"] == 2
+    assert [error["line"] for error in stats["errors"]] == [1, 2]
+    assert count(db, 'customers') == 5
+
+def test_upsert_updates_existing_rows(db):
+    records = [(1, {"id": 1, "name": "Laptop Pro", "category": "Electronics", "price": 1500, "inventory": 10})]
+    ingest_rows('products', records, upsert=True)
+
+    assert tuple(db.execute("SELECT name, price FROM products WHERE id = 1").fetchone()) == ("Laptop Pro", 1500.0)
+    assert count(db, 'products') == 8
+
+def test_parsers():
+    ndjson = list(parse_ndjson(['{"a": 1}\n', '\n', '[1]\n', 'nope\n']))
+    assert ndjson[0] == (1, {"a": 1})
+    assert [line for line, _ in ndjson] == [1, 3, 4]
+    assert all(isinstance(record, RowError) for _, record in ndjson[1:])
+
+    rows = list(parse_csv(['name,price\n', 'Pen,\n']))
+    assert rows == [(2, {"name": "Pen", "price": None})]
+
+@pytest.mark.parametrize('read', [
+    lambda: database.execute_query("SELECT COUNT(*) FROM customers")[0]["COUNT(*)"],
+    lambda: database.execute_query_fast("SELECT COUNT(*) FROM customers").rows[0][0],
+    lambda: database.execute_query_fast("SELECT COUNT(*) FROM customers", pooled=True).rows[0][0],
+])
+def test_readers_never_see_an_open_write_transaction(db, read):
+    results = []
+    with database.db_lock.writing():
+        db.execute("INSERT INTO customers (name, email, signup_date) VALUES ('X', 'x@example.com', '2024-01-01')")
+        reader = threading.Thread(target=lambda: results.append(read()))
+        reader.start()
+        reader.join(0.2)
+        # The read waits for the writer instead of counting the uncommitted row
+        assert reader.is_alive()
+        db.rollback()
+    reader.join(5)
+    assert results == [5]
+
+def test_window_where_every_batch_fails_still_bumps_the_version(db):
+    before = database.get_data_version(['customers'])
+    stats = ingest_rows('customers', [(1, {"name": "Dup", "email": "john@example.com", "signup_date": "2024-01-01"})])
+    assert stats["failed_batches"] == 1
+    assert stats["rows_written"] == 0
+    assert database.get_data_version(['customers']) != before
+
+def test_writer_may_read_while_holding_the_lock(db):
+    with database.db_lock.writing():
+        with database.db_lock.writing():
+            assert database.execute_query("SELECT COUNT(*) FROM sales")[0]["COUNT(*)"] == 10
+
+def test_pooled_connections_share_the_database_instead_of_copying_it(db):
+    with database.pooled_connection() as first:
+        pass
+    ingest_rows('customers', customers(3, start=100))
+    with database.pooled_connection() as pooled:
+        # The idle connection is reused and sees the new rows straight away
+        assert pooled is first
+        assert pooled.execute("SELECT COUNT(*) FROM customers").fetchone()[0] == 8
+        with database.pooled_connection() as other:
+            assert other is not pooled
+            assert other.execute("SELECT COUNT(*) FROM customers").fetchone()[0] == 8
@@ -0,0 +1,67 @@
+import pytest
+
+from app.query_processor import QueryProcessor
+
+@pytest.fixture
+def processor():
+    return QueryProcessor()
+
+# Single questions from the README, demo.py, test_api.py and warmup_queries.txt,
+# plus conjunctions that join things other than independent questions
+SINGLE_QUERIES = [
+    "What is the total sales amount?",
+    "Show me all sales from last month",
+    "Count all customers",
+    "What is the average product price?",
+    "What is the cheapest product in Electronics?",
+    "Show me all products under $100",
+    "Find all products in the Electronics category",
+    "List all sales from this year",
+    "Count all products in Electronics category",
+    "What is the cheapest item in the Clothing category?",
+    "How many products are in the Electronics category?",
+    "Show me sales from customers and products",
+    "Show customers who signed up and bought products",
+    "Show me products over $50 and under $100",
+    "Count products in Electronics and Clothing",
+    "Show products, customers and sales",
+    "List the budget and targets",
+    # Operations that share one subject
+    "What is the maximum and minimum price of products",
+    "Get the total and average sales last month",
+    "list the highest and lowest priced products",
+]
+
+@pytest.mark.parametrize('query_text', SINGLE_QUERIES)
+def test_single_queries_stay_whole(processor, query_text):
+    assert processor.split_compound_query(query_text) == [query_text]
+
+@pytest.mark.parametrize('query_text, parts', [
+    ("how many customers and total sales last month and cheapest electronics",
+     ["how many customers", "total sales last month", "cheapest electronics"]),
+    ("Count all customers; show me all products", ["Count all customers", "show me all products"]),
+    ("Average product price as well as the most expensive product",
+     ["Average product price", "the most expensive product"]),
+    ("Show me products over $50 and under $100, plus count customers",
+     ["Show me products over $50 and under $100", "count customers"]),
+])
+def test_independent_questions_are_split(processor, query_text, parts):
+    assert processor.split_compound_query(query_text) == parts
+
+def test_keywords_match_whole_words_only(processor):
+    # "get" in "budget" and "list" in "listings" are not operations
+    assert processor.split_compound_query("count customers and budget listings") == \
+        ["count customers and budget listings"]
+
+def test_parse_cache_hands_out_copies(processor):
+    first = processor.process_query("Count all customers")
+    first["conditions"].append("tampered")
+    assert processor.process_query("Count all customers")["conditions"] == []
+
+@pytest.mark.parametrize('query_text, sql', [
+    ("What is the maximum and minimum price of products", "SELECT MAX(price) FROM products"),
+    ("list the highest and lowest priced products", "SELECT * FROM products ORDER BY price ASC LIMIT 1"),
+])
+def test_shared_subjects_keep_their_single_query_sql(processor, query_text, sql):
+    assert processor.split_compound_query(query_text) == [query_text]
+    assert processor.process_query(query_text)["sql"] == sql
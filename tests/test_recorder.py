@@ -0,0 +1,11 @@
+import json
+
+from app.recorder import WorkloadRecorder
+
+def test_recorder_logs_tenant(tmp_path):
+    recorder = WorkloadRecorder(str(tmp_path / 'log.jsonl'))
+    recorder.record('/query', 'admin', 'Count all sales', 'SELECT COUNT(*) FROM sales', 0.001, 1, 'acme')
+    recorder.flush()
+    entry = json.loads((tmp_path / 'log.jsonl').read_text())
+    assert entry["tenant"] == 'acme'
+    assert entry["rows"] == 1
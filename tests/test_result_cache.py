@@ -0,0 +1,67 @@
+import os
+
+from app import result_cache
+from app.result_cache import SharedResultCache, default_cache_path
+
+def test_put_get_and_invalidate(tmp_path):
+    cache = SharedResultCache(str(tmp_path / 'cache.sqlite'))
+    cache.put('a', b'{"data":[]}', 'origin-1', ['sales'])
+    cache.put('b', b'{"data":[1]}', 'origin-1', ['customers'])
+    assert cache.get('a') == b'{"data":[]}'
+
+    cache.invalidate('origin-1', ['sales'])
+    assert cache.get('a') is None
+    assert cache.get('b') == b'{"data":[1]}'
+    assert cache.stats()["hits"] == 2
+
+def test_oldest_entries_are_evicted(tmp_path):
+    cache = SharedResultCache(str(tmp_path / 'cache.sqlite'), max_bytes=25)
+    for key in 'abc':
+        cache.put(key, b'x' * 10, 'origin', ['sales'])
+    assert cache.get('a') is None
+    assert cache.get('c') == b'x' * 10
+    assert cache.stats()["evictions"] == 1
+
+def test_other_builds_do_not_share_entries(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    SharedResultCache(path).put('key', b'old build', 'origin', ['sales'])
+    other = SharedResultCache(path)
+    other.namespace = 'v0-otherbuild:'
+    assert other.get('key') is None
+
+def test_default_path_is_a_private_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache.tempfile, 'gettempdir', lambda: str(tmp_path))
+    path = default_cache_path()
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+
+def test_default_path_refuses_a_shared_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache.tempfile, 'gettempdir', lambda: str(tmp_path))
+    directory = os.path.dirname(default_cache_path())
+    os.chmod(directory, 0o777)
+    assert default_cache_path() is None
+    monkeypatch.delenv('RESULT_CACHE_PATH')
+    assert SharedResultCache.from_env() is None
+
+def test_cache_hits_return_the_canonical_bytes_and_row_count(db, tmp_path):
+    from app.query_processor import QueryProcessor
+
+    uncached = QueryProcessor().execute_query_encoded(QueryProcessor().process_query("Show me all products"))
+    processor = QueryProcessor(result_cache=SharedResultCache(str(tmp_path / 'cache.sqlite')))
+    query_data = processor.process_query("Show me all products")
+
+    # Warmed through the dict path, served through the encoded path
+    processor.execute_query(query_data)
+    assert processor.execute_query_encoded(query_data) == uncached
+    assert uncached[1] == 8
+    assert processor.result_cache.stats()["hits"] == 1
+
+def test_files_without_row_counts_are_upgraded(tmp_path):
+    import sqlite3
+    path = str(tmp_path / 'old.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, '
+                 'origin TEXT NOT NULL, tables TEXT NOT NULL, created REAL NOT NULL)')
+    conn.close()
+    cache = SharedResultCache(path)
+    cache.put('key', b'[]', 'origin', ['sales'], 0)
+    assert cache.get_entry('key') == (b'[]', 0)
@@ -0,0 +1,71 @@
+import gzip
+import json
+
+def test_query_returns_results_with_an_etag(client):
+    response = client.post('/query', json={"query": "Count all customers"})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert response.json["results"] == {"data": [{"COUNT(*)": 5}], "success": True}
+    assert response.headers["ETag"].startswith('W/')
+
+def test_unchanged_data_answers_304(client):
+    etag = client.post('/query', json={"query": "Show me all products"}).headers["ETag"]
+    response = client.post('/query', json={"query": "Show me all products"}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+def test_writes_change_the_etag(client):
+    etag = client.post('/query', json={"query": "Count all customers"}).headers["ETag"]
+    ingest = client.post('/ingest/customers', data='{"name": "New", "email": "new@example.com", "signup_date": "2024-01-01"}\n',
+                         content_type='application/x-ndjson')
+    assert ingest.json["rows_written"] == 1
+
+    response = client.post('/query', json={"query": "Count all customers"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["results"]["data"] == [{"COUNT(*)": 6}]
+    assert response.headers["ETag"] != etag
+
+def test_large_responses_are_gzipped(client):
+    response = client.post('/query', json={"query": "Show me all sales"}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == 'gzip'
+    assert 'Accept-Encoding' in response.headers["Vary"]
+    assert len(json.loads(gzip.decompress(response.data))["results"]["data"]) == 10
+
+def test_small_responses_are_not_compressed(client):
+    response = client.post('/query', json={"query": "Count all customers"}, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+def test_ingest_csv_reports_rejected_rows(client):
+    body = "name,category,price,inventory\nPen,Office,1.5,100\nBad,Office,cheap,1\n"
+    response = client.post('/ingest/products', data=body, content_type='text/csv')
+    assert response.status_code == 200
+    assert response.json["rows_written"] == 1
+    assert response.json["errors"][0]["line"] == 3
+
+def test_ingest_requires_admin(client):
+    token = client.post('/auth/login', json={"username": "user", "password": "user123"}).json["token"]
+    response = client.post('/ingest/products', data='', content_type='text/csv',
+                           headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+def test_ingest_rejects_unknown_tables_and_types(client):
+    assert client.post('/ingest/orders', data='', content_type='text/csv').status_code == 400
+    assert client.post('/ingest/products', data='', content_type='text/plain').status_code == 415
+
+def test_compound_query_answers_each_part(client):
+    response = client.post('/query', json={"query": "Count all customers and show me all products"})
+    assert response.json["compound"] is True
+    parts = response.json["parts"]
+    assert [part["query"] for part in parts] == ["Count all customers", "show me all products"]
+    assert parts[0]["results"]["data"] == [{"COUNT(*)": 5}]
+    assert len(parts[1]["results"]["data"]) == 8
+
+    etag = response.headers["ETag"]
+    repeat = client.post('/query', json={"query": "Count all customers and show me all products"},
+                         headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+
+def test_single_query_with_a_conjunction_keeps_the_single_shape(client):
+    response = client.post('/query', json={"query": "Show me sales from customers and products"})
+    assert "compound" not in response.json
+    assert response.json["parsed_query"]["sql"]
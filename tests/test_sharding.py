@@ -0,0 +1,132 @@
+import os
+import sqlite3
+
+import pytest
+
+from app.sharding import ShardRouter
+
+def sales(count):
+    for i in range(1, count + 1):
+        yield (i, 1 + i % 5, 1 + i % 8, 1 + i % 3, f"2023-{1 + i % 12:02d}-{1 + i % 28:02d}", float(10 + i % 97))
+
+@pytest.fixture(scope='module')
+def routers(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('shards')
+    single = ShardRouter(str(directory / 'single'))
+    single.create_partitions(1)
+    single.load('sales', sales(500))
+    sharded = ShardRouter(str(directory / 'sharded'), processes=2)
+    sharded.create_partitions(4)
+    sharded.load('sales', sales(500))
+    yield single, sharded
+    sharded.close()
+
+@pytest.mark.parametrize('sql', [
+    "SELECT COUNT(*) FROM sales",
+    "SELECT SUM(total_price) FROM sales",
+    "SELECT AVG(total_price) FROM sales",
+    "SELECT MAX(total_price) FROM sales WHERE quantity = 2",
+    "SELECT MIN(total_price) FROM sales WHERE sale_date BETWEEN '2023-03-01' AND '2023-03-31'",
+    "SELECT AVG(quantity) FROM sales WHERE customer_id = 3",
+])
+def test_fan_out_aggregates_match_a_single_file(routers, sql):
+    single, sharded = routers
+    expected = single.execute_query(sql)
+    merged = sharded.execute_query(sql)
+    assert list(merged[0]) == list(expected[0])
+    assert list(merged[0].values())[0] == pytest.approx(list(expected[0].values())[0])
+
+def test_aggregates_over_no_rows(routers):
+    _, sharded = routers
+    assert sharded.execute_query("SELECT COUNT(*) FROM sales WHERE quantity = 99") == [{"COUNT(*)": 0}]
+    assert sharded.execute_query("SELECT SUM(total_price) FROM sales WHERE quantity = 99") == [{"SUM(total_price)": None}]
+    assert sharded.execute_query("SELECT AVG(total_price) FROM sales WHERE quantity = 99") == [{"AVG(total_price)": None}]
+
+def test_fan_out_rows_reapply_order_and_limit(routers):
+    single, sharded = routers
+    sql = "SELECT * FROM sales ORDER BY total_price DESC LIMIT 7"
+    expected = single.execute_query(sql)
+    merged = sharded.execute_query(sql)
+    assert [row["total_price"] for row in merged] == [row["total_price"] for row in expected]
+    assert len(sharded.execute_query("SELECT * FROM sales")) == 500
+
+def test_tenant_queries_read_only_their_file(tmp_path):
+    router = ShardRouter(str(tmp_path))
+    router.create_tenant('acme')
+    router.create_tenant('globex')
+    router.load('sales', sales(3), tenant='acme')
+    assert router.execute_query("SELECT COUNT(*) FROM sales", tenant='acme') == [{"COUNT(*)": 3}]
+    assert router.execute_query("SELECT COUNT(*) FROM sales", tenant='globex') == [{"COUNT(*)": 0}]
+    with pytest.raises(ValueError):
+        router.shard_paths('missing')
+    with pytest.raises(ValueError):
+        router.tenant_path('../etc')
+
+def test_data_version_changes_on_write(tmp_path):
+    router = ShardRouter(str(tmp_path))
+    router.create_tenant('acme')
+    before = router.data_version('acme')
+    conn = sqlite3.connect(router.tenant_path('acme'))
+    with conn:
+        conn.execute("INSERT INTO customers (name, email, signup_date) VALUES ('a', 'a@example.com', '2024-01-01')")
+    conn.close()
+    assert router.data_version('acme') != before
+
+def test_data_version_sees_same_size_updates(tmp_path):
+    router = ShardRouter(str(tmp_path))
+    router.create_tenant('acme')
+    path = router.tenant_path('acme')
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("INSERT INTO customers (name, email, signup_date) VALUES ('a', 'a@example.com', '2024-01-01')")
+    stat = os.stat(path)
+    before = router.data_version('acme')
+    with conn:
+        conn.execute("UPDATE customers SET name = 'b'")
+    conn.close()
+    # Same size, and the mtime put back as if the clock had not ticked
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(path).st_size == stat.st_size
+    assert router.data_version('acme') != before
+
+def test_data_version_sees_wal_commits(tmp_path):
+    router = ShardRouter(str(tmp_path))
+    router.create_tenant('acme')
+    path = router.tenant_path('acme')
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    stat = os.stat(path)
+    versions = [router.data_version('acme')]
+    for name in ('a', 'b'):
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO customers (id, name, email, signup_date) "
+                         "VALUES (1, ?, 'a@example.com', '2024-01-01')", (name,))
+        versions.append(router.data_version('acme'))
+    # The commits only went to the -wal file
+    assert os.stat(path).st_mtime_ns == stat.st_mtime_ns
+    assert len(set(versions)) == 3
+    conn.close()
+
+@pytest.fixture
+def sharded_client(client, app, tmp_path, monkeypatch):
+    """The test client with reads routed to one tenant shard"""
+    from app import routes
+    router = ShardRouter(str(tmp_path))
+    router.create_tenant('acme')
+    router.load('sales', sales(3), tenant='acme')
+    monkeypatch.setattr(routes.query_processor, 'shard_router', router)
+    return client
+
+def test_validate_runs_against_the_tenant_shard(sharded_client):
+    response = sharded_client.post('/validate', json={"query": "Count all sales", "tenant": "acme"})
+    assert response.json["validation"]["valid"] is True
+    response = sharded_client.post('/validate', json={"query": "Count all sales", "tenant": "missing"})
+    assert response.json["validation"]["valid"] is False
+
+def test_ingest_is_rejected_while_sharded(sharded_client):
+    response = sharded_client.post('/ingest/sales', data='', content_type='application/x-ndjson')
+    assert response.status_code == 400
+
+def test_tenant_requires_sharding(client):
+    assert client.post('/validate', json={"query": "Count all sales", "tenant": "acme"}).status_code == 400
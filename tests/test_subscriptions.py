@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from app.ingest import ingest_rows
+from app.query_processor import QueryProcessor
+from app.sharding import ShardRouter
+from app.subscriptions import SubscriptionCapacityError, SubscriptionLimitError, SubscriptionManager
+
+def next_event(subscription):
+    return subscription.events.get(timeout=5)
+
+def test_first_event_is_the_current_result(db):
+    manager = SubscriptionManager(QueryProcessor())
+    subscription = manager.subscribe('admin', "Count all customers")
+    event, payload = next_event(subscription)
+    assert event == 'result'
+    assert payload["results"]["data"] == [{"COUNT(*)": 5}]
+
+def test_writes_push_deltas_to_select_subscribers(db):
+    manager = SubscriptionManager(QueryProcessor())
+    subscription = manager.subscribe('admin', "Show me all customers")
+    next_event(subscription)
+
+    ingest_rows('customers', [(1, {"id": 6, "name": "New", "email": "new@example.com", "signup_date": "2024-01-01"})])
+    event, payload = next_event(subscription)
+    # The query is LIMIT 10, so the sixth customer appears as an added row
+    assert event == 'delta'
+    assert payload["added"] == [{"id": 6, "name": "New", "email": "new@example.com", "signup_date": "2024-01-01"}]
+    assert payload["removed"] == []
+
+def test_identical_queries_share_an_evaluation(db):
+    manager = SubscriptionManager(QueryProcessor())
+    manager.subscribe('admin', "Count all customers")
+    manager.subscribe('user', "Count all customers")
+    assert manager.stats() == {"subscriptions": 2, "distinct_queries": 1, "evaluations": 1}
+
+def test_limits_per_identity_and_per_worker(db):
+    manager = SubscriptionManager(QueryProcessor(), max_per_identity=1, max_streams=2)
+    first = manager.subscribe('admin', "Count all customers")
+    with pytest.raises(SubscriptionLimitError):
+        manager.subscribe('admin', "Count all sales")
+    manager.subscribe('user', "Count all sales")
+    with pytest.raises(SubscriptionCapacityError):
+        manager.subscribe('other', "Count all products")
+
+    manager.unsubscribe(first)
+    manager.subscribe('other', "Count all products")
+
+def test_sharded_subscriptions_refresh_when_shard_files_change(db, tmp_path):
+    router = ShardRouter(str(tmp_path))
+    router.create_tenant('acme')
+    manager = SubscriptionManager(QueryProcessor(shard_router=router), poll_interval=0.05)
+    subscription = manager.subscribe('admin', "Count all customers")
+    assert next_event(subscription)[1]["results"]["data"] == [{"COUNT(*)": 0}]
+
+    conn = sqlite3.connect(router.tenant_path('acme'))
+    with conn:
+        conn.execute("INSERT INTO customers (name, email, signup_date) VALUES ('a', 'a@example.com', '2024-01-01')")
+    conn.close()
+
+    event, payload = next_event(subscription)
+    assert event == 'result'
+    assert payload["results"]["data"] == [{"COUNT(*)": 1}]
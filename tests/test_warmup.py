@@ -0,0 +1,43 @@
+import json
+
+from app.query_processor import QueryProcessor
+from app.sharding import ShardRouter
+from app.warmup import Warmup, load_popular_queries
+
+class RecordingProcessor(QueryProcessor):
+    def __init__(self, shard_router=None):
+        super().__init__(shard_router=shard_router)
+        self.executed = []
+
+    def execute_query(self, query_data, tenant=None, pooled=False):
+        self.executed.append(query_data["sql"])
+        return super().execute_query(query_data, tenant, pooled)
+
+def test_log_is_ranked_by_popularity(tmp_path):
+    log = tmp_path / 'queries.jsonl'
+    lines = [{"query": "Count all customers"}] * 2 + [{"query": "Show me all products"}] * 3 + [{"sql": "x"}]
+    log.write_text('\n'.join(json.dumps(line) for line in lines) + '\nnot json\n')
+    assert load_popular_queries(str(log)) == ["Show me all products", "Count all customers"]
+
+def test_compound_queries_are_warmed_part_by_part(db):
+    processor = RecordingProcessor()
+    warmup = Warmup(processor, ["How many customers and total sales"]).start()
+    assert warmup.wait() == 'warm'
+    assert processor.executed == [processor.process_query("How many customers")["sql"],
+                                  processor.process_query("total sales")["sql"]]
+
+def test_budget_stops_warmup_early(db):
+    warmup = Warmup(RecordingProcessor(), ["Count all customers", "Show me all products"], budget=0).start()
+    assert warmup.wait() == 'partial'
+    assert warmup.stats()["queries_warmed"] == 0
+
+def test_sharded_queries_are_parsed_but_not_run(db, tmp_path):
+    router = ShardRouter(str(tmp_path))
+    router.create_partitions(2)
+    processor = RecordingProcessor(shard_router=router)
+    warmup = Warmup(processor, ["Count all customers"]).start()
+    assert warmup.wait() == 'warm'
+    assert processor.executed == []
+    assert "Count all customers" in processor._parse_cache
+    # No shard process pool was started before the fork
+    assert router._pool is None